@@ -0,0 +1,4 @@
+"""Performance tooling for the widget backend.
+
+Nothing in this package is imported by the application itself.
+"""
@@ -0,0 +1,85 @@
+"""Synthetic but schema-valid Vianexus API rows for benchmarks and local testing."""
+
+import random
+import time
+from datetime import date, timedelta
+
+
+def trading_days(count: int, end: date | None = None) -> list[str]:
+    """The `count` most recent weekdays up to `end` (default: today), newest first"""
+    day = end or date.today()
+    days = []
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day.isoformat())
+        day -= timedelta(days=1)
+    return days
+
+
+def stock_stats_rows(symbol: str, last: int = 1, seed: int | None = None) -> list[dict]:
+    """STOCK_STATS_US rows for symbol, newest first, as returned by the API"""
+    rng = random.Random(seed if seed is not None else symbol)
+    price = rng.uniform(10, 500)
+    now_ms = time.time() * 1000
+    rows = []
+    for offset, day in enumerate(trading_days(last)):
+        rows.append(
+            {
+                "52weekChange": round(rng.uniform(-0.5, 1.0), 4),
+                "52weekHigh": round(price * 1.3, 2),
+                "52weekHighDate": "2025-07-15",
+                "52weekLow": round(price * 0.7, 2),
+                "52weekLowDate": "2025-03-10",
+                "avg30DayVolume": rng.randint(100_000, 90_000_000),
+                "beta": round(rng.uniform(0.3, 2.0), 4),
+                "date": day,
+                "day200MovingAverage": round(price * rng.uniform(0.85, 1.05), 4),
+                "day50MovingAverage": round(price * rng.uniform(0.9, 1.1), 4),
+                "epsTtm": round(rng.uniform(-2, 20), 2),
+                "issuerName": f"{symbol} Holdings Inc.",
+                "mic": rng.choice(["XNAS", "XNYS", "ARCX"]),
+                "peRatioTtm": round(rng.uniform(5, 80), 2),
+                "sharesOutstanding": rng.randint(10_000_000, 16_000_000_000),
+                "symbol": symbol,
+                "ytdChange": round(rng.uniform(-0.4, 0.8), 4),
+                "id": "STOCK_STATS_US",
+                "key": symbol,
+                "subkey": "",
+                "updated": now_ms - offset * 86_400_000,
+            }
+        )
+    return rows
+
+
+def vnx_quote_rows(symbol: str, last: int = 1, seed: int | None = None) -> list[dict]:
+    """VNX_QUOTE rows for symbol, newest first, as returned by the API"""
+    rng = random.Random(seed if seed is not None else symbol)
+    price = rng.uniform(10, 500)
+    now_ms = int(time.time() * 1000)
+    rows = []
+    for offset in range(last):
+        spread = price * 0.0005
+        rows.append(
+            {
+                "vnxSymbol": symbol,
+                "vnxBidSize": rng.randint(1, 500),
+                "vnxBidPrice": round(price - spread, 2),
+                "vnxAskSize": rng.randint(1, 500),
+                "vnxAskPrice": round(price + spread, 2),
+                "vnxPrice": round(price, 2),
+                "vnxLastSalePrice": round(price, 2),
+                "vnxLastSaleSize": rng.randint(1, 1000),
+                "vnxLowPrice": round(price * 0.98, 2),
+                "vnxHighPrice": round(price * 1.02, 2),
+                "vnxOpenPrice": round(price * 0.99, 2),
+                "vnxClosePrice": round(price * 1.01, 2),
+                "vnxVolume": rng.randint(10_000, 50_000_000),
+                "vnxTimestamp": now_ms - offset * 1000,
+                "vnxMarketPercent": round(rng.uniform(0, 0.05), 5),
+                "vnxHighTime": now_ms - 3_600_000,
+                "vnxLowTime": now_ms - 7_200_000,
+                "vnxPriceType": "LAST_SALE",
+                "MarketVolume": rng.randint(100_000, 90_000_000),
+            }
+        )
+    return rows
@@ -0,0 +1,91 @@
+"""Benchmark decoding of upstream responses into validated models.
+
+Compares the previous path (response.json() then Model(**item) per row) against the
+single-pass TypeAdapter.validate_json path used by Dataset.decode.
+
+Usage:
+    uv run python -m benchmarks.decode
+"""
+
+import json
+import timeit
+
+from pydantic import TypeAdapter
+
+from benchmarks.data import stock_stats_rows, vnx_quote_rows
+from vianexus.schemas import StockStatsData, VnxQuoteData
+
+CASES = [
+    ("STOCK_STATS_US", StockStatsData, stock_stats_rows),
+    ("VNX_QUOTE", VnxQuoteData, vnx_quote_rows),
+]
+SIZES = [1, 30, 1000]
+
+
+def payload(rows_factory, size: int) -> bytes:
+    """Raw response body with `size` rows, spread over several symbols for large sizes"""
+    rows = []
+    per_symbol = min(size, 30)
+    for index in range(0, size, per_symbol):
+        rows += rows_factory(f"SYM{index}", min(per_symbol, size - index))
+    return json.dumps(rows).encode()
+
+
+def two_pass(model, content: bytes):
+    return [model(**item) for item in json.loads(content)]
+
+
+def one_pass(adapter: TypeAdapter, content: bytes):
+    return adapter.validate_json(content)
+
+
+def run(repeat: int = 5) -> list[dict]:
+    """Time both decode paths for every dataset and size
+
+    Returns:
+        One result per case with the best time per call of each path in microseconds
+    """
+    results = []
+    for name, model, rows_factory in CASES:
+        adapter = TypeAdapter(list[model])
+        for size in SIZES:
+            content = payload(rows_factory, size)
+            assert two_pass(model, content) == one_pass(adapter, content)
+            number = max(1, 2000 // size)
+            old = min(
+                timeit.repeat(
+                    lambda model=model, content=content: two_pass(model, content),
+                    number=number,
+                    repeat=repeat,
+                )
+            )
+            new = min(
+                timeit.repeat(
+                    lambda adapter=adapter, content=content: one_pass(adapter, content),
+                    number=number,
+                    repeat=repeat,
+                )
+            )
+            results.append(
+                {
+                    "dataset": name,
+                    "rows": size,
+                    "two_pass_us": old / number * 1e6,
+                    "one_pass_us": new / number * 1e6,
+                }
+            )
+    return results
+
+
+def main():
+    print(f"{'dataset':<16}{'rows':>6}{'json+Model(**)':>18}{'validate_json':>16}{'speedup':>9}")
+    for result in run():
+        print(
+            f"{result['dataset']:<16}{result['rows']:>6}"
+            f"{result['two_pass_us']:>16.1f}us{result['one_pass_us']:>14.1f}us"
+            f"{result['two_pass_us'] / result['one_pass_us']:>8.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""Load generator for the widget endpoints.
+
+Concurrent clients request /stock_stats, /stock_chart, /widgets.json and /apps.json for
+a fixed duration, picking symbols from a Zipf popularity distribution, and report
+requests/sec and latency percentiles per endpoint.
+
+By default the FastAPI app and the mock Vianexus API (benchmarks.mock_vianexus) both run
+in this process over ASGI transports, so no server needs to be started and results do
+not depend on the network; the mock is configured with the MOCK_* environment variables.
+With --url, an already running backend is load tested instead.
+
+Usage:
+    uv run python -m benchmarks.loadtest --duration 20 --concurrency 50 --output baseline.json
+    uv run python -m benchmarks.loadtest --output new.json --compare baseline.json
+    uv run python -m benchmarks.loadtest --url http://127.0.0.1:7779
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import random
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+import httpx
+
+DEFAULT_MIX = "stock_stats=6,stock_chart=2,widgets.json=1,apps.json=1"
+SYMBOL_ENDPOINTS = {"stock_stats", "stock_chart"}
+
+
+def zipf_weights(count: int, exponent: float) -> list[float]:
+    """Cumulative weights of `count` items whose popularity follows Zipf's law"""
+    return list(itertools.accumulate(1 / rank**exponent for rank in range(1, count + 1)))
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """Parse "endpoint=weight" comma-separated pairs"""
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name:
+            mix[name.strip().lstrip("/")] = float(weight or 1)
+    return mix
+
+
+def percentile(ordered: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(latencies: list[float], statuses: Counter, elapsed: float) -> dict:
+    """Throughput, error count and latency percentiles (milliseconds) of one endpoint"""
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "rps": len(ordered) / elapsed if elapsed else 0.0,
+        "errors": sum(count for status, count in statuses.items() if status != "200"),
+        "statuses": dict(statuses),
+        "mean_ms": sum(ordered) / len(ordered) * 1000 if ordered else 0.0,
+        "p50_ms": percentile(ordered, 50) * 1000,
+        "p95_ms": percentile(ordered, 95) * 1000,
+        "p99_ms": percentile(ordered, 99) * 1000,
+        "max_ms": ordered[-1] * 1000 if ordered else 0.0,
+    }
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    duration: float,
+    concurrency: int,
+    mix: dict[str, float],
+    symbols: list[str],
+    zipf_exponent: float,
+    warmup: float = 0.0,
+    seed: int | None = None,
+) -> dict:
+    """Drive the endpoints with `concurrency` closed-loop clients
+
+    Args:
+        client: Client whose base URL is the backend under test
+        duration: Seconds to measure for
+        concurrency: Number of clients, each sending its next request when the last one ends
+        mix: Relative weight of each endpoint
+        symbols: Symbol universe, most popular first
+        zipf_exponent: Zipf exponent of the symbol popularity (0 for uniform)
+        warmup: Seconds to send requests for before measuring
+        seed: Seed for the endpoint and symbol choices
+
+    Returns:
+        Overall and per-endpoint results
+    """
+    rng = random.Random(seed)
+    endpoints = list(mix)
+    endpoint_weights = list(itertools.accumulate(mix.values()))
+    symbol_weights = zipf_weights(len(symbols), zipf_exponent)
+    latencies: dict[str, list[float]] = defaultdict(list)
+    statuses: dict[str, Counter] = defaultdict(Counter)
+    started = time.perf_counter()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    async def worker():
+        while (now := time.perf_counter()) < stop_at:
+            endpoint = rng.choices(endpoints, cum_weights=endpoint_weights)[0]
+            params = {}
+            if endpoint in SYMBOL_ENDPOINTS:
+                params["symbol"] = rng.choices(symbols, cum_weights=symbol_weights)[0]
+            try:
+                response = await client.get(f"/{endpoint}", params=params)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            if now >= measure_from:
+                latencies[endpoint].append(time.perf_counter() - now)
+                statuses[endpoint][status] += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - measure_from
+    all_latencies = [value for values in latencies.values() for value in values]
+    all_statuses = sum(statuses.values(), Counter())
+    return {
+        "overall": summarize(all_latencies, all_statuses, elapsed),
+        "endpoints": {
+            endpoint: summarize(latencies[endpoint], statuses[endpoint], elapsed)
+            for endpoint in endpoints
+        },
+    }
+
+
+async def run_in_process(args: argparse.Namespace, **load_args) -> dict:
+    """Load test the app in this process against the in-process mock Vianexus API"""
+    from benchmarks.mock_vianexus import MockSettings, create_app
+    from main import app
+    from vianexus.client import close_client, open_client
+
+    mock_settings = MockSettings()
+    mock = create_app(mock_settings)
+    await open_client(transport=httpx.ASGITransport(app=mock))
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app") as client:
+            results = await run_load(client, **load_args)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=mock)) as client:
+            results["upstream"] = (await client.get("http://mock/stats")).json()
+    finally:
+        await close_client()
+    results["mock"] = mock_settings.model_dump()
+    return results
+
+
+async def run_remote(args: argparse.Namespace, **load_args) -> dict:
+    """Load test a running backend"""
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as client:
+        return await run_load(client, **load_args)
+
+
+def print_results(results: dict, baseline: dict | None = None):
+    header = f"{'endpoint':<14}{'requests':>9}{'rps':>9}{'errors':>7}"
+    header += f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    print(header + ("   vs baseline (rps / p99)" if baseline else ""))
+    rows = {"overall": results["overall"], **results["endpoints"]}
+    for name, row in rows.items():
+        line = f"{name:<14}{row['requests']:>9}{row['rps']:>9.1f}{row['errors']:>7}"
+        line += f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+        base = None
+        if baseline:
+            base = baseline["overall"] if name == "overall" else baseline["endpoints"].get(name)
+        if base and base["rps"] and base["p99_ms"]:
+            rps_change = row["rps"] / base["rps"] - 1
+            p99_change = row["p99_ms"] / base["p99_ms"] - 1
+            line += f"   {rps_change:+7.1%} / {p99_change:+7.1%}"
+        print(line)
+    if "upstream" in results:
+        print(f"upstream: {results['upstream']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Backend to load test (default: in-process app and mock)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to measure for")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds before measuring")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent clients")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="endpoint=weight pairs")
+    parser.add_argument("--symbols", type=int, default=500, help="Size of the symbol universe")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent (0 for uniform)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the request choices")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Baseline results JSON file to compare against")
+    args = parser.parse_args()
+
+    load_args = {
+        "duration": args.duration,
+        "concurrency": args.concurrency,
+        "mix": parse_mix(args.mix),
+        "symbols": [f"T{index:04d}" for index in range(args.symbols)],
+        "zipf_exponent": args.zipf,
+        "warmup": args.warmup,
+        "seed": args.seed,
+    }
+    runner = run_remote if args.url else run_in_process
+    results = asyncio.run(runner(args, **load_args))
+    results["config"] = {
+        **{key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "mix": load_args["mix"],
+        "target": args.url or "in-process",
+    }
+    results["environment"] = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Microbenchmarks for the hot paths of the widget endpoints.
+
+Covers decoding and validation of upstream rows, the stock stats metric building, the
+stock chart figure construction and serialization (checked against and compared with
+the Plotly-object reference), and base_layout(). Results can be saved as JSON and
+compared against a stored baseline, so regressions show up in review.
+
+Usage:
+    uv run python -m benchmarks.micro --output baseline.json
+    uv run python -m benchmarks.micro --compare baseline.json
+    uv run python -m benchmarks.micro --filter chart
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import timeit
+from datetime import datetime, timezone
+from typing import Callable
+
+from pydantic import TypeAdapter
+
+from benchmarks.data import stock_stats_rows, vnx_quote_rows
+from benchmarks.plotly_reference import check as check_chart, plotly_chart
+from utils.plotly_config import base_layout, figure_json
+from utils.responses import RawJSONResponse
+from vianexus.schemas import StockStatsData, VnxQuoteData
+from widgets.stock_chart import build_chart
+from widgets.stock_stats import build_metrics
+
+# Seconds each timing repeat should take; the number of calls per repeat is calibrated to it
+TARGET_REPEAT_SECONDS = 0.1
+
+
+def cases() -> dict[str, Callable[[], object]]:
+    """Benchmark name to the callable being timed"""
+    benchmarks = {}
+    for model, rows_factory in ((StockStatsData, stock_stats_rows), (VnxQuoteData, vnx_quote_rows)):
+        adapter = TypeAdapter(list[model])
+        for size in (1, 30, 1000):
+            rows = [row for index in range(0, size, 30) for row in rows_factory(f"S{index}", 30)]
+            content = json.dumps(rows[:size]).encode()
+            benchmarks[f"validate/{model.__name__}/{size}"] = (
+                lambda adapter=adapter, content=content: adapter.validate_json(content)
+            )
+
+    stats = StockStatsData(**stock_stats_rows("AAPL")[0])
+    quote = VnxQuoteData(**vnx_quote_rows("AAPL")[0])
+    benchmarks["metrics/all"] = lambda: build_metrics(stats, quote, "all")
+    benchmarks["metrics/no_quote"] = lambda: build_metrics(stats, None, "all")
+
+    check_chart()
+    history = [StockStatsData(**row) for row in stock_stats_rows("AAPL", 30)]
+    fig = build_chart("AAPL", history)
+    benchmarks["chart/build"] = lambda: build_chart("AAPL", history)
+    benchmarks["chart/to_json"] = lambda: figure_json(fig)
+    benchmarks["chart/build+to_json"] = lambda: figure_json(build_chart("AAPL", history))
+    benchmarks["chart/response"] = lambda: RawJSONResponse(
+        figure_json(build_chart("AAPL", history))
+    )
+    benchmarks["chart/plotly_reference"] = lambda: plotly_chart("AAPL", history).to_json()
+
+    benchmarks["base_layout"] = lambda: base_layout(
+        x_title="Date", y_title="Price (USD)", y_format="$,.2f"
+    )
+    return benchmarks
+
+
+def measure(func: Callable[[], object], repeat: int) -> dict:
+    """Time func, calibrating the number of calls so each repeat takes about 0.1s
+
+    Returns:
+        Best and median time per call in microseconds, and the calls per repeat
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, int(number * TARGET_REPEAT_SECONDS / 0.2))
+    times = [total / number * 1e6 for total in timer.repeat(repeat=repeat, number=number)]
+    return {"best_us": min(times), "median_us": statistics.median(times), "number": number}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Print the results next to the baseline
+
+    Returns:
+        Names of the benchmarks that are slower than the baseline by more than threshold
+    """
+    regressions = []
+    print(f"{'benchmark':<32}{'best':>12}{'baseline':>12}{'change':>9}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        line = f"{name:<32}{result['best_us']:>10.1f}us"
+        if base:
+            change = result["best_us"] / base["best_us"] - 1
+            line += f"{base['best_us']:>10.1f}us{change:>+9.1%}"
+            if change > threshold:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", default="", help="Only run benchmarks containing this text")
+    parser.add_argument("--repeat", type=int, default=7, help="Timing repeats per benchmark")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Baseline results JSON file to compare against")
+    parser.add_argument(
+        "--threshold", type=float, default=0.1, help="Slowdown reported as a regression"
+    )
+    args = parser.parse_args()
+
+    results = {}
+    for name, func in cases().items():
+        if args.filter in name:
+            results[name] = measure(func, args.repeat)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["benchmarks"]
+    regressions = compare(results, baseline, args.threshold)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "benchmarks": results,
+                    "environment": {
+                        "python": platform.python_version(),
+                        "machine": platform.machine(),
+                        "timestamp": datetime.now(timezone.utc).isoformat(),
+                    },
+                },
+                f,
+                indent=2,
+            )
+    if regressions:
+        sys.exit(f"Regressions over {args.threshold:.0%}: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Local stand-in for the Vianexus API, with latency and fault injection.
+
+Serves synthetic but schema-valid STOCK_STATS_US and VNX_QUOTE rows at
+/v1/data/{namespace}/{dataset}/{symbols}. Latency, error rate and throttling are
+configured with MOCK_* environment variables (see MockSettings).
+
+Usage:
+    MOCK_LATENCY_MS=80 MOCK_ERROR_RATE=0.02 uv run python -m benchmarks.mock_vianexus --port 8100
+    VIANEXUS_BASE_URL=http://127.0.0.1:8100/v1 uv run uvicorn main:app --port 7779
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from benchmarks.data import stock_stats_rows, vnx_quote_rows
+
+DATASETS = {
+    ("CORE", "STOCK_STATS_US"): stock_stats_rows,
+    ("EDGE", "VNX_QUOTE"): vnx_quote_rows,
+}
+
+
+class MockSettings(BaseSettings):
+    """Behaviour of the mock server"""
+
+    latency_ms: float = Field(
+        default=50.0,
+        validation_alias="MOCK_LATENCY_MS",
+        description="Median response latency in milliseconds",
+    )
+    latency_sigma: float = Field(
+        default=0.5,
+        validation_alias="MOCK_LATENCY_SIGMA",
+        description="Sigma of the log-normal latency distribution (0 for a constant latency)",
+    )
+    latency_per_symbol_ms: float = Field(
+        default=0.5,
+        validation_alias="MOCK_LATENCY_PER_SYMBOL_MS",
+        description="Extra latency per requested symbol and row in milliseconds",
+    )
+    tail_rate: float = Field(
+        default=0.0,
+        validation_alias="MOCK_TAIL_RATE",
+        description="Fraction of responses delayed by tail_latency_ms on top of the latency",
+    )
+    tail_latency_ms: float = Field(
+        default=1000.0,
+        validation_alias="MOCK_TAIL_LATENCY_MS",
+        description="Extra latency of tail responses in milliseconds",
+    )
+    error_rate: float = Field(
+        default=0.0,
+        validation_alias="MOCK_ERROR_RATE",
+        description="Fraction of requests answered with a 503 error",
+    )
+    throttle_rate: float = Field(
+        default=0.0,
+        validation_alias="MOCK_THROTTLE_RATE",
+        description="Fraction of requests answered with a 429 response",
+    )
+    max_rps: float = Field(
+        default=0.0,
+        validation_alias="MOCK_MAX_RPS",
+        description="Requests per second above which 429 responses are returned (0 for no limit)",
+    )
+    seed: int | None = Field(
+        default=None,
+        validation_alias="MOCK_SEED",
+        description="Seed for the latency and fault injection random generator",
+    )
+
+    model_config = SettingsConfigDict(case_sensitive=False, extra="ignore")
+
+
+class _Throttle:
+    """Fixed one-second window request counter"""
+
+    def __init__(self, max_rps: float):
+        self.max_rps = max_rps
+        self._window = 0
+        self._count = 0
+
+    def allow(self) -> bool:
+        if self.max_rps <= 0:
+            return True
+        window = int(time.monotonic())
+        if window != self._window:
+            self._window = window
+            self._count = 0
+        self._count += 1
+        return self._count <= self.max_rps
+
+
+def create_app(settings: MockSettings | None = None) -> FastAPI:
+    """Create the mock API app
+
+    Args:
+        settings: Mock behaviour, read from the environment if not given
+
+    Returns:
+        FastAPI app; GET /stats reports the requests it served
+    """
+    settings = settings or MockSettings()
+    rng = random.Random(settings.seed)
+    throttle = _Throttle(settings.max_rps)
+    stats: Counter[str] = Counter()
+    app = FastAPI(title="Mock Vianexus API")
+
+    def latency(rows: int) -> float:
+        median = settings.latency_ms / 1000
+        seconds = median * rng.lognormvariate(0, settings.latency_sigma) if median else 0.0
+        seconds += rows * settings.latency_per_symbol_ms / 1000
+        if rng.random() < settings.tail_rate:
+            seconds += settings.tail_latency_ms / 1000
+        return seconds
+
+    @app.get("/v1/data/{namespace}/{dataset}/{symbols}")
+    async def get_data(namespace: str, dataset: str, symbols: str, last: int = 1, token: str = ""):
+        stats["requests"] += 1
+        rows_factory = DATASETS.get((namespace.upper(), dataset.upper()))
+        if rows_factory is None:
+            stats["not_found"] += 1
+            return JSONResponse({"error": f"Unknown dataset {namespace}/{dataset}"}, 404)
+        if not throttle.allow() or rng.random() < settings.throttle_rate:
+            stats["throttled"] += 1
+            return JSONResponse({"error": "Too many requests"}, 429, headers={"Retry-After": "1"})
+
+        names = [name.strip().upper() for name in symbols.split(",") if name.strip()]
+        await asyncio.sleep(latency(len(names) * last))
+        if rng.random() < settings.error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"error": "Service unavailable"}, 503)
+
+        stats["ok"] += 1
+        stats["symbols"] += len(names)
+        stats[f"{namespace}/{dataset}".upper()] += 1
+        return [row for name in names for row in rows_factory(name, last)]
+
+    @app.get("/stats")
+    async def get_stats():
+        return dict(stats)
+
+    @app.post("/stats/reset")
+    async def reset_stats():
+        stats.clear()
+        return {}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+    uvicorn.run(create_app(), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
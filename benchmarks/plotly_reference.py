@@ -0,0 +1,127 @@
+"""Plotly-object reference implementation of the stock chart.
+
+This is the code widgets/stock_chart.py and utils/plotly_config.py built the chart with,
+using go.Figure/go.Scatter and a go.Layout template, before it was built from plain
+dicts. check() verifies that both produce the same Plotly JSON (tests/ covers the
+details), and benchmarks.micro times them against each other.
+
+Usage:
+    uv run python -m benchmarks.plotly_reference
+"""
+
+import json
+
+import plotly.graph_objects as go
+
+from benchmarks.data import stock_stats_rows
+from utils.plotly_config import figure_json
+from vianexus.schemas import StockStatsData
+from widgets.stock_chart import build_chart
+
+
+def dark_template() -> go.layout.Template:
+    """utils.plotly_config.get_dark_template() as it was"""
+    return go.layout.Template(
+        layout=go.Layout(
+            paper_bgcolor="rgba(0,0,0,0)",
+            plot_bgcolor="rgba(0,0,0,0)",
+            font={"color": "#ffffff"},
+            xaxis={
+                "showgrid": False,
+                "color": "#ffffff",
+                "linecolor": "rgba(128, 128, 128, 0.2)",
+            },
+            yaxis={
+                "showgrid": True,
+                "gridcolor": "rgba(128, 128, 128, 0.2)",
+                "color": "#ffffff",
+                "linecolor": "rgba(128, 128, 128, 0.2)",
+            },
+            hovermode="x unified",
+            hoverlabel={
+                "bgcolor": "white",
+                "font_color": "black",
+            },
+        )
+    )
+
+
+def plotly_base_layout(x_title=None, y_title=None, y_format=".2f") -> dict:
+    """utils.plotly_config.base_layout() as it was, a fresh dict holding Plotly objects"""
+    # Hide x-axis title for date/time axes
+    if x_title and x_title.lower() in ["date", "time", "timestamp", "datetime"]:
+        x_title = None
+
+    return {
+        "template": dark_template(),
+        "xaxis": {"title": x_title, "showgrid": False},
+        "yaxis": {"title": y_title, "tickformat": y_format},
+        "margin": {"b": 40, "l": 80, "r": 20, "t": 40},
+        "hovermode": "x unified",
+    }
+
+
+def plotly_chart(symbol: str, records: list[StockStatsData]) -> go.Figure:
+    """widgets.stock_chart.build_chart() as it was, built with Plotly objects"""
+    # Extract dates and moving averages from the response
+    dates = []
+    ma_50 = []
+    ma_200 = []
+
+    for record in records:
+        dates.append(record.date)
+        ma_50.append(record.day_50_moving_average)
+        ma_200.append(record.day_200_moving_average)
+
+    fig = go.Figure()
+    fig.add_trace(
+        go.Scatter(
+            x=dates,
+            y=ma_50,
+            mode="lines+markers",
+            name="50-Day MA",
+            line={"color": "#00B140", "width": 2},
+            marker={"size": 4},
+            hovertemplate="<b>%{x}</b><br>50-Day MA: $%{y:.2f}<extra></extra>",
+        )
+    )
+
+    fig.add_trace(
+        go.Scatter(
+            x=dates,
+            y=ma_200,
+            mode="lines+markers",
+            name="200-Day MA",
+            line={"color": "#FF8000", "width": 2},
+            marker={"size": 4},
+            hovertemplate="<b>%{x}</b><br>200-Day MA: $%{y:.2f}<extra></extra>",
+        )
+    )
+
+    # Apply the dark theme layout
+    layout = plotly_base_layout(x_title="Date", y_title="Price (USD)", y_format="$,.2f")
+    layout["title"] = f"{symbol.upper()} - Moving Averages (1 Month)"
+    layout["showlegend"] = True  # Show legend for multiple series
+
+    fig.update_layout(layout)
+
+    return fig
+
+
+def check(symbols=("AAPL", "BRK.B"), sizes=(1, 30)):
+    """Assert that build_chart and the Plotly reference serialize to the same figure
+
+    Raises:
+        AssertionError: Naming the first symbol and size whose output differs
+    """
+    for symbol in symbols:
+        for size in sizes:
+            records = [StockStatsData(**row) for row in stock_stats_rows(symbol, size)]
+            expected = json.loads(plotly_chart(symbol, records).to_json())
+            actual = json.loads(figure_json(build_chart(symbol, records)))
+            assert actual == expected, f"Chart for {symbol} ({size} rows) differs from Plotly"
+
+
+if __name__ == "__main__":
+    check()
+    print("build_chart output matches the Plotly reference")
@@ -24,6 +24,254 @@ class Settings(BaseSettings):
         description="Base URL for Vianexus API",
     )
 
+    # HTTP client configuration (shared connection pool for the Vianexus API)
+    http_timeout: float = Field(
+        default=10.0,
+        validation_alias="HTTP_TIMEOUT",
+        description="Read and write timeout in seconds for requests to the Vianexus API",
+    )
+    http_connect_timeout: float = Field(
+        default=3.0,
+        validation_alias="HTTP_CONNECT_TIMEOUT",
+        description="Timeout in seconds for opening a connection to the Vianexus API",
+    )
+    http_pool_timeout: float = Field(
+        default=2.0,
+        validation_alias="HTTP_POOL_TIMEOUT",
+        description="Timeout in seconds for getting a connection from the HTTP pool",
+    )
+    http_max_connections: int = Field(
+        default=100,
+        validation_alias="HTTP_MAX_CONNECTIONS",
+        description="Maximum number of concurrent connections in the HTTP pool",
+    )
+    http_max_keepalive_connections: int = Field(
+        default=20,
+        validation_alias="HTTP_MAX_KEEPALIVE_CONNECTIONS",
+        description="Maximum number of idle keep-alive connections kept in the HTTP pool",
+    )
+    http_keepalive_expiry: float = Field(
+        default=30.0,
+        validation_alias="HTTP_KEEPALIVE_EXPIRY",
+        description="Seconds an idle keep-alive connection is kept before being closed",
+    )
+
+    # Dataset cache (in-process, shared by all datasets)
+    cache_max_bytes: int = Field(
+        default=64 * 1024 * 1024,
+        validation_alias="CACHE_MAX_BYTES",
+        description="Memory budget of the dataset cache in bytes",
+    )
+    response_cache_max_bytes: int = Field(
+        default=16 * 1024 * 1024,
+        validation_alias="RESPONSE_CACHE_MAX_BYTES",
+        description="Memory budget of the rendered widget response cache in bytes",
+    )
+    stock_chart_cache_ttl: float = Field(
+        default=3600.0,
+        validation_alias="STOCK_CHART_CACHE_TTL",
+        description="Seconds a rendered stock chart is kept while its data is unchanged "
+        "(0 disables)",
+    )
+    stock_stats_metrics_cache_ttl: float = Field(
+        default=3600.0,
+        validation_alias="STOCK_STATS_METRICS_CACHE_TTL",
+        description="Seconds built stock stats metrics are kept while their data is unchanged "
+        "(0 disables)",
+    )
+    stock_stats_cache_ttl: float = Field(
+        default=300.0,
+        validation_alias="STOCK_STATS_CACHE_TTL",
+        description="Seconds STOCK_STATS_US data is cached (0 disables caching)",
+    )
+    stock_stats_cache_hard_ttl: float = Field(
+        default=3600.0,
+        validation_alias="STOCK_STATS_CACHE_HARD_TTL",
+        description="Seconds stale STOCK_STATS_US data is still served while it is refreshed "
+        "in the background (stale-while-revalidate, 0 disables)",
+    )
+    vnx_quote_cache_ttl: float = Field(
+        default=2.0,
+        validation_alias="VNX_QUOTE_CACHE_TTL",
+        description="Seconds VNX_QUOTE data is cached (0 disables caching)",
+    )
+    vnx_quote_cache_hard_ttl: float = Field(
+        default=0.0,
+        validation_alias="VNX_QUOTE_CACHE_HARD_TTL",
+        description="Seconds stale VNX_QUOTE data is still served while it is refreshed "
+        "in the background (stale-while-revalidate, 0 disables)",
+    )
+
+    # STOCK_STATS_US history store (SQLite on disk, or in memory if no path is set)
+    history_store_path: str = Field(
+        default="",
+        validation_alias="HISTORY_STORE_PATH",
+        description="Path of the SQLite file persisting STOCK_STATS_US history "
+        "(empty keeps it in memory)",
+    )
+    history_store_retention_days: int = Field(
+        default=400,
+        validation_alias="HISTORY_STORE_RETENTION_DAYS",
+        description="Days of STOCK_STATS_US history kept in the store",
+    )
+    history_memory_max_symbols: int = Field(
+        default=1000,
+        validation_alias="HISTORY_MEMORY_MAX_SYMBOLS",
+        description="Symbols whose history is kept in memory when no on-disk store is set",
+    )
+    stock_stats_incremental: bool = Field(
+        default=True,
+        validation_alias="STOCK_STATS_INCREMENTAL",
+        description="Only fetch STOCK_STATS_US rows newer than the stored history",
+    )
+
+    # Hedged VNX_QUOTE requests
+    vnx_quote_hedge: bool = Field(
+        default=False,
+        validation_alias="VNX_QUOTE_HEDGE",
+        description="Send a second VNX_QUOTE request when the first one is slow",
+    )
+    vnx_quote_hedge_percentile: float = Field(
+        default=95.0,
+        validation_alias="VNX_QUOTE_HEDGE_PERCENTILE",
+        description="Latency percentile of recent VNX_QUOTE requests used as hedge delay",
+    )
+    vnx_quote_hedge_min_delay: float = Field(
+        default=0.05,
+        validation_alias="VNX_QUOTE_HEDGE_MIN_DELAY",
+        description="Minimum seconds to wait before sending a hedge VNX_QUOTE request",
+    )
+    vnx_quote_hedge_max_ratio: float = Field(
+        default=0.1,
+        validation_alias="VNX_QUOTE_HEDGE_MAX_RATIO",
+        description="Maximum fraction of VNX_QUOTE requests that may be hedged (extra load)",
+    )
+
+    # Micro-batching of single-symbol requests into one multi-symbol upstream call
+    batch_window_ms: float = Field(
+        default=5.0,
+        validation_alias="BATCH_WINDOW_MS",
+        description="Milliseconds to collect single-symbol requests into one upstream call "
+        "(0 disables batching)",
+    )
+    batch_max_symbols: int = Field(
+        default=50,
+        validation_alias="BATCH_MAX_SYMBOLS",
+        description="Maximum number of symbols sent in one batched upstream call",
+    )
+
+    # Splitting of large symbol lists into concurrent upstream calls
+    symbol_chunk_size: int = Field(
+        default=50,
+        validation_alias="SYMBOL_CHUNK_SIZE",
+        description="Maximum number of symbols in one upstream request URL (0 disables chunking)",
+    )
+    symbol_chunk_concurrency: int = Field(
+        default=4,
+        validation_alias="SYMBOL_CHUNK_CONCURRENCY",
+        description="Maximum number of chunk requests in flight for one symbol list",
+    )
+
+    # Retries and circuit breaker for Vianexus API requests
+    http_retries: int = Field(
+        default=2,
+        validation_alias="HTTP_RETRIES",
+        description="Number of retries for failed Vianexus API requests",
+    )
+    http_retry_backoff: float = Field(
+        default=0.1,
+        validation_alias="HTTP_RETRY_BACKOFF",
+        description="Base delay in seconds of the jittered exponential retry backoff",
+    )
+    http_retry_backoff_max: float = Field(
+        default=2.0,
+        validation_alias="HTTP_RETRY_BACKOFF_MAX",
+        description="Maximum delay in seconds between retries",
+    )
+    breaker_failure_rate: float = Field(
+        default=0.5,
+        validation_alias="BREAKER_FAILURE_RATE",
+        description="Fraction of failed requests to a dataset that opens its circuit breaker",
+    )
+    breaker_min_calls: int = Field(
+        default=10,
+        validation_alias="BREAKER_MIN_CALLS",
+        description="Minimum number of requests in the window before the breaker can open",
+    )
+    breaker_window: float = Field(
+        default=30.0,
+        validation_alias="BREAKER_WINDOW",
+        description="Seconds of request history the failure rate is computed over",
+    )
+    breaker_open_seconds: float = Field(
+        default=15.0,
+        validation_alias="BREAKER_OPEN_SECONDS",
+        description="Seconds an open circuit breaker fails fast before trying upstream again",
+    )
+
+    # Client-side rate limiting of Vianexus API requests (token buckets)
+    rate_limit_per_second: float = Field(
+        default=0.0,
+        validation_alias="RATE_LIMIT_PER_SECOND",
+        description="Requests per second allowed per API key (0 disables the key limit)",
+    )
+    rate_limit_burst: int = Field(
+        default=20,
+        validation_alias="RATE_LIMIT_BURST",
+        description="Requests per API key that may be sent at once before rate limiting applies",
+    )
+    # Example: "CORE/STOCK_STATS_US:5:10,EDGE/VNX_QUOTE:20"
+    rate_limit_datasets: str = Field(
+        default="",
+        validation_alias="RATE_LIMIT_DATASETS",
+        description="Per-dataset limits as comma-separated NAMESPACE/DATASET:rate[:burst] pairs",
+    )
+    rate_limit_max_queue: int = Field(
+        default=100,
+        validation_alias="RATE_LIMIT_MAX_QUEUE",
+        description="Maximum requests queued per rate limiter before new ones are shed",
+    )
+    rate_limit_max_wait: float = Field(
+        default=2.0,
+        validation_alias="RATE_LIMIT_MAX_WAIT",
+        description="Maximum seconds a request waits for the rate limiter before being shed",
+    )
+
+    # Widget fetch deadlines, propagated to the upstream requests
+    stats_fetch_timeout: float = Field(
+        default=5.0,
+        validation_alias="STATS_FETCH_TIMEOUT",
+        description="Seconds the stock stats widget waits for STOCK_STATS_US data",
+    )
+    chart_fetch_timeout: float = Field(
+        default=5.0,
+        validation_alias="CHART_FETCH_TIMEOUT",
+        description="Seconds the stock chart widget waits for STOCK_STATS_US history",
+    )
+    quote_fetch_timeout: float = Field(
+        default=1.0,
+        validation_alias="QUOTE_FETCH_TIMEOUT",
+        description="Seconds the stock stats widget waits for the VNX_QUOTE real-time quote "
+        "before rendering without it",
+    )
+    refresh_timeout: float = Field(
+        default=10.0,
+        validation_alias="REFRESH_TIMEOUT",
+        description="Seconds a background refresh of a stale cache entry may take",
+    )
+
+    # Sampled logging of upstream response payloads at DEBUG level
+    payload_log_sample_rate: int = Field(
+        default=0,
+        validation_alias="PAYLOAD_LOG_SAMPLE_RATE",
+        description="Log the payload of 1 in N upstream responses at DEBUG level (0 disables)",
+    )
+    payload_log_max_bytes: int = Field(
+        default=2048,
+        validation_alias="PAYLOAD_LOG_MAX_BYTES",
+        description="Maximum number of payload bytes included in a payload log message",
+    )
+
     # Logging configuration
     log_level: str = Field(
         default="DEBUG",
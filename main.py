@@ -5,6 +5,7 @@ Individual widget implementations are located in the widgets/ directory.
 """
 
 import json
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI
@@ -13,12 +14,24 @@ from fastapi.responses import JSONResponse
 
 import utils.logging as logging_utils
 from registry import WIDGETS
+from vianexus.client import close_client, open_client
+from vianexus.ratelimit import limiter_stats
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the shared Vianexus HTTP client on startup and close it on shutdown."""
+    await open_client()
+    yield
+    await close_client()
+
 
 # Initialize FastAPI application with metadata
 app = FastAPI(
     title="Vianexus Stock Stats",
     description="Stock statistics widgets powered by Vianexus API",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Define allowed origins for CORS (Cross-Origin Resource Sharing)
@@ -63,6 +76,16 @@ def get_apps():
     )
 
 
+@app.get("/rate_limits")
+def get_rate_limits():
+    """Client-side rate limiter state, for sizing the Vianexus API limits.
+
+    Returns:
+        list: Queue depth, wait times and shed counts of each rate limiter in use.
+    """
+    return limiter_stats()
+
+
 # Import all widgets to register them with the application
 # This must come after the app is defined so widgets can register their routes
 from widgets.stock_stats import get_stock_stats  # noqa: E402
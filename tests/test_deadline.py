@@ -0,0 +1,151 @@
+"""Deadlines of the requests waiting on shared upstream work.
+
+Coalesced loads and batches run under the latest deadline of the requests waiting on
+them, down to the HTTP timeouts, and are cancelled once every request has given up.
+"""
+
+import asyncio
+import contextvars
+
+import httpx
+import pytest
+
+from vianexus.batching import SymbolBatcher
+from vianexus.client import close_client, open_client
+from vianexus.dataset import VnxQuote
+from vianexus.deadline import deadline, remaining
+from vianexus.singleflight import SingleFlight
+
+
+class Probe:
+    """Shared work that reports its deadline and waits until released or cancelled"""
+
+    def __init__(self):
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+        self.cancelled = False
+        self.context = None
+
+    def remaining(self):
+        """Seconds left before the deadline the work runs under, rounded"""
+        left = self.context.run(remaining)
+        return None if left is None else round(left)
+
+    async def __call__(self):
+        self.context = contextvars.copy_context()
+        self.started.set()
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return remaining()
+
+
+async def join(flights: SingleFlight, probe: Probe, seconds: float | None):
+    with deadline(seconds):
+        return await asyncio.wait_for(flights.do("key", probe), timeout=remaining())
+
+
+def test_shared_load_runs_under_latest_deadline():
+    async def main():
+        flights, probe = SingleFlight(), Probe()
+        first = asyncio.ensure_future(join(flights, probe, 10))
+        await probe.started.wait()
+        assert probe.remaining() == 10
+
+        second = asyncio.ensure_future(join(flights, probe, 30))
+        await asyncio.sleep(0)
+        assert probe.remaining() == 30
+
+        second.cancel()
+        await asyncio.sleep(0)
+        assert probe.remaining() == 10
+
+        unbounded = asyncio.ensure_future(join(flights, probe, None))
+        await asyncio.sleep(0)
+        assert probe.remaining() is None
+
+        probe.release.set()
+        assert await first is await unbounded is None
+
+    asyncio.run(main())
+
+
+def test_abandoned_load_is_cancelled():
+    async def main():
+        flights, probe = SingleFlight(), Probe()
+        with pytest.raises(TimeoutError):
+            await join(flights, probe, 0.05)
+        await asyncio.sleep(0)
+        assert probe.cancelled
+        assert "key" not in flights
+
+    asyncio.run(main())
+
+
+def test_load_continues_while_a_waiter_remains():
+    async def main():
+        flights, probe = SingleFlight(), Probe()
+        patient = asyncio.ensure_future(join(flights, probe, 10))
+        with pytest.raises(TimeoutError):
+            await join(flights, probe, 0.05)
+        assert not probe.cancelled
+
+        probe.release.set()
+        assert round(await patient) == 10
+
+    asyncio.run(main())
+
+
+def test_abandoned_batch_is_cancelled():
+    async def main():
+        probe = Probe()
+
+        async def fetch(symbols, last):
+            return await probe()
+
+        batcher = SymbolBatcher(fetch, lambda record: record, window=0.01, max_symbols=10)
+        with deadline(0.1):
+            submitted = [asyncio.ensure_future(batcher.submit(s)) for s in ("A", "B")]
+            await probe.started.wait()
+        assert probe.remaining() == 0
+
+        for task in submitted:
+            task.cancel()
+        await asyncio.gather(*submitted, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert probe.cancelled
+
+    asyncio.run(main())
+
+
+def test_upstream_request_is_bounded_by_the_deadline_and_cancelled():
+    timeouts = []
+
+    class SlowTransport(httpx.AsyncBaseTransport):
+        def __init__(self):
+            self.cancelled = asyncio.Event()
+
+        async def handle_async_request(self, request):
+            timeouts.append(request.extensions["timeout"]["read"])
+            try:
+                await asyncio.sleep(3)
+            except asyncio.CancelledError:
+                self.cancelled.set()
+                raise
+            return httpx.Response(200, json=[])
+
+    async def main():
+        transport = SlowTransport()
+        await open_client(transport=transport)
+        try:
+            with pytest.raises(TimeoutError):
+                await VnxQuote().adata(["DEADLINE"], timeout=0.2)
+            await asyncio.wait_for(transport.cancelled.wait(), timeout=1)
+        finally:
+            await close_client()
+
+    asyncio.run(main())
+    assert len(timeouts) == 1
+    assert 0 < timeouts[0] <= 0.2
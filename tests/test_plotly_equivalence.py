@@ -0,0 +1,65 @@
+"""The dict-built charts must match what Plotly itself builds.
+
+The reference figures are built through Plotly objects (go.Figure, go.Scatter and a
+go.Layout template) exactly as the widgets did before they built plain dicts, so Plotly
+validates and normalizes them; the dicts built by utils.plotly_config must serialize
+to the same JSON.
+"""
+
+import json
+
+import plotly.graph_objects as go
+import pytest
+
+from benchmarks.data import stock_stats_rows
+from benchmarks.plotly_reference import dark_template, plotly_base_layout, plotly_chart
+from utils.plotly_config import (
+    DARK_TEMPLATE_JSON,
+    base_layout,
+    figure_json,
+    get_dark_template,
+    to_json,
+)
+from vianexus.schemas import StockStatsData
+from widgets.stock_chart import build_chart
+
+
+def test_dark_template_matches_plotly():
+    expected = dark_template().to_plotly_json()
+    assert json.loads(DARK_TEMPLATE_JSON) == expected
+    assert get_dark_template().to_plotly_json() == expected
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        (),
+        ("Date", "Price (USD)", "$,.2f"),
+        ("timestamp", None, ".2f"),
+        ("Volume", "Shares", ",.0f"),
+        (None, "Ratio", ".1%"),
+    ],
+)
+def test_base_layout_matches_plotly(args):
+    # Applied to a figure like the widgets did; go.Layout() alone drops None titles
+    expected = go.Figure().update_layout(plotly_base_layout(*args)).to_plotly_json()["layout"]
+    assert json.loads(to_json(base_layout(*args))) == expected
+
+
+def test_base_layout_is_read_only():
+    layout = base_layout(x_title="Date", y_title="Price (USD)")
+    with pytest.raises(TypeError):
+        layout["title"] = "Changed"
+    with pytest.raises(TypeError):
+        layout["xaxis"]["showgrid"] = True
+
+
+@pytest.mark.parametrize("symbol", ["AAPL", "brk.b"])
+@pytest.mark.parametrize("size", [0, 1, 30])
+def test_build_chart_matches_plotly(symbol, size):
+    records = [StockStatsData(**row) for row in stock_stats_rows(symbol.upper(), size)]
+    expected = plotly_chart(symbol, records)
+    actual = build_chart(symbol, records)
+
+    assert actual == expected.to_plotly_json()
+    assert json.loads(figure_json(actual)) == json.loads(expected.to_json())
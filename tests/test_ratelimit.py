@@ -0,0 +1,41 @@
+"""Token buckets shared by the API key and dataset rate limiters."""
+
+import asyncio
+
+import pytest
+
+from vianexus.ratelimit import RateLimitExceeded, TokenBucket, acquire_all
+
+
+def bucket(name: str, burst: int) -> TokenBucket:
+    return TokenBucket(name, rate=1.0, burst=burst, max_queue=10, max_wait=0.5)
+
+
+def test_shed_by_second_bucket_gives_first_token_back():
+    key, dataset = bucket("api_key", 2), bucket("CORE/STOCK_STATS_US", 1)
+
+    async def main():
+        await acquire_all([key, dataset])
+        with pytest.raises(RateLimitExceeded):
+            await acquire_all([key, dataset])
+
+    asyncio.run(main())
+    assert key.stats()["tokens"] == pytest.approx(1.0, abs=0.01)
+    assert dataset.shed == 1
+
+
+def test_cancelled_wait_gives_tokens_back():
+    key = bucket("api_key", 1)
+    dataset = TokenBucket("CORE/STOCK_STATS_US", rate=1.0, burst=1, max_queue=10, max_wait=5)
+
+    async def main():
+        await acquire_all([dataset])
+        waiter = asyncio.create_task(acquire_all([key, dataset]))
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    asyncio.run(main())
+    assert key.stats()["tokens"] == pytest.approx(1.0, abs=0.01)
+    assert dataset.stats()["tokens"] < 1
@@ -0,0 +1,166 @@
+"""Contiguous depth and ordering of the STOCK_STATS_US history stores."""
+
+import asyncio
+from datetime import date, timedelta
+
+import httpx
+import pytest
+
+from vianexus.client import close_client, open_client
+from vianexus.dataset import StockStats
+from vianexus.schemas import StockStatsData
+from vianexus.store import (
+    HistoryStore,
+    MemoryHistoryStore,
+    is_ascending,
+    merged_depth,
+    trading_days_since,
+)
+
+
+def trading_days(count: int) -> list[str]:
+    """ISO dates of the `count` most recent weekdays before today, oldest first"""
+    days = []
+    day = date.today()
+    while len(days) < count:
+        day -= timedelta(days=1)
+        if day.weekday() < 5:
+            days.append(day.isoformat())
+    return days[::-1]
+
+
+def next_trading_day(day: str) -> str:
+    following = date.fromisoformat(day) + timedelta(days=1)
+    while following.weekday() >= 5:
+        following += timedelta(days=1)
+    return following.isoformat()
+
+
+def row(day: str) -> StockStatsData:
+    return StockStatsData.model_validate(
+        {
+            "52weekChange": 0.1,
+            "52weekHigh": 200.0,
+            "52weekHighDate": day,
+            "52weekLow": 100.0,
+            "52weekLowDate": day,
+            "avg30DayVolume": 1000,
+            "beta": 1.0,
+            "date": day,
+            "day200MovingAverage": 150.0,
+            "day50MovingAverage": 160.0,
+            "epsTtm": 5.0,
+            "issuerName": "Apple Inc",
+            "mic": "XNAS",
+            "peRatioTtm": 30.0,
+            "sharesOutstanding": 1000,
+            "symbol": "AAPL",
+            "ytdChange": 0.05,
+            "id": "STOCK_STATS_US",
+            "key": "AAPL",
+            "subkey": "",
+            "updated": 0.0,
+        }
+    )
+
+
+def test_trading_days_since_skips_weekends():
+    # Friday 2024-01-05 to Monday 2024-01-08
+    assert trading_days_since("2024-01-05", date(2024, 1, 8)) == 1
+    assert trading_days_since("2024-01-05", date(2024, 1, 5)) == 0
+    assert trading_days_since("2024-01-04", date(2024, 1, 9)) == 3
+
+
+def test_merged_depth_without_previous_rows():
+    assert merged_depth(0, None, ["2024-01-02"], 5) == 5
+    assert merged_depth(30, "2024-01-05", [], 1) == 1
+
+
+def test_merged_depth_overlapping_rows_keep_history():
+    assert merged_depth(30, "2024-01-05", ["2024-01-04", "2024-01-05"], 2) == 30
+    assert merged_depth(30, "2024-01-05", ["2024-01-05", "2024-01-08"], 2) == 31
+    assert merged_depth(5, "2024-01-05", [f"2024-01-{d:02}" for d in range(1, 11)], 10) == 10
+
+
+def test_merged_depth_next_trading_day_extends_history():
+    assert merged_depth(30, "2024-01-04", ["2024-01-05"], 1) == 31
+    # Friday to Monday
+    assert merged_depth(30, "2024-01-05", ["2024-01-08"], 1) == 31
+    assert merged_depth(30, "2024-01-05", ["2024-01-08", "2024-01-09"], 2) == 32
+
+
+def test_merged_depth_gap_trusts_only_new_rows():
+    assert merged_depth(30, "2024-01-04", ["2024-01-08"], 1) == 1
+    assert merged_depth(30, "2024-01-02", ["2024-01-08", "2024-01-09"], 2) == 2
+
+
+def test_is_ascending():
+    assert is_ascending(["2024-01-04", "2024-01-05"])
+    assert not is_ascending(["2024-01-05", "2024-01-04"])
+    assert is_ascending(["2024-01-05"], previous=True)
+    assert not is_ascending(["2024-01-05"], previous=False)
+    assert not is_ascending([], previous=False)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        history = MemoryHistoryStore(max_symbols=10, retention_days=400)
+    else:
+        history = HistoryStore(str(tmp_path / "history.db"), retention_days=400)
+    yield history
+    history.close()
+
+
+def test_next_trading_day_write_keeps_history(store):
+    days = trading_days(31)
+    store.write("AAPL", 30, [row(day) for day in days[:30]])
+    store.write("AAPL", 1, [row(days[30])])
+
+    assert store.latest("AAPL") == (days[30], 31)
+    rows = store.read("AAPL", 30, 300)
+    assert [r.date for r in rows] == days[1:]
+
+
+def test_write_after_gap_keeps_only_new_rows(store):
+    days = trading_days(32)
+    store.write("AAPL", 30, [row(day) for day in days[:30]])
+    store.write("AAPL", 1, [row(days[31])])
+
+    assert store.latest("AAPL") == (days[31], 1)
+    assert store.read("AAPL", 30, 300) is None
+    assert [r.date for r in store.read("AAPL", 1, 300)] == [days[31]]
+
+
+def test_depth_limited_by_retention(store):
+    store.retention_days = 10
+    days = trading_days(30)
+    store.write("AAPL", 30, [row(day) for day in days])
+    store.write("AAPL", 1, [row(next_trading_day(days[-1]))])
+
+    kept = store.latest("AAPL")[1]
+    assert kept < 30
+    assert len(store.read("AAPL", kept, 300)) == kept
+
+
+def test_empty_upstream_result_is_not_stored():
+    calls = []
+
+    class EmptyTransport(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request):
+            calls.append(request.url)
+            return httpx.Response(200, json=[])
+
+    async def main():
+        await open_client(transport=EmptyTransport())
+        try:
+            stats = StockStats()
+            stats._store = MemoryHistoryStore(max_symbols=10, retention_days=400)
+            assert await stats._load(["NEWCO"], 5) == []
+            assert stats._store.latest("NEWCO") is None
+            assert stats._store.read("NEWCO", 5, 300) is None
+        finally:
+            await close_client()
+
+    asyncio.run(main())
+    assert len(calls) == 1
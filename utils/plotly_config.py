@@ -1,54 +1,147 @@
-"""Plotly configuration for dark theme charts."""
+"""Plotly configuration for dark theme charts.
 
-import plotly.graph_objects as go
+Figures are built as plain dicts in the JSON shape Plotly itself produces
+(fig.to_plotly_json()), so serving a chart does not construct and validate Plotly
+objects. Plotly is only imported by get_dark_template(), for developer tooling.
 
+The template and base layouts are built and serialized once and shared by every chart,
+so they are read-only; widgets add their own keys by merging into a new dict, and the
+pre-serialized JSON of the shared parts is spliced into each figure's JSON.
+"""
 
-def get_dark_template():
-    """Returns a Plotly template configured for dark theme."""
-    return go.layout.Template(
-        layout=go.Layout(
-            paper_bgcolor="rgba(0,0,0,0)",
-            plot_bgcolor="rgba(0,0,0,0)",
-            font={"color": "#ffffff"},
-            xaxis={
+import json
+from functools import lru_cache
+
+
+class Frozen(dict):
+    """Read-only dict that carries its own serialized JSON
+
+    Being a dict, it is accepted anywhere a layout or trace dict is, including json.dumps.
+    """
+
+    __slots__ = ("json",)
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Frozen chart fragments are read-only, merge them into a new dict")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+
+def freeze(value):
+    """Read-only copy of a JSON-like value, with its JSON serialized once"""
+    if isinstance(value, Frozen):
+        return value
+    if isinstance(value, dict):
+        frozen = Frozen({key: freeze(item) for key, item in value.items()})
+        frozen.json = to_json(frozen)
+        return frozen
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+_encoder = json.JSONEncoder(separators=(",", ":"))
+
+
+def to_json(value) -> str:
+    """Compact JSON, like Plotly produces"""
+    return _encoder.encode(value)
+
+
+# Dark theme template, in the normalized form Plotly serializes templates to
+DARK_TEMPLATE = freeze(
+    {
+        "layout": {
+            "paper_bgcolor": "rgba(0,0,0,0)",
+            "plot_bgcolor": "rgba(0,0,0,0)",
+            "font": {"color": "#ffffff"},
+            "xaxis": {
                 "showgrid": False,
                 "color": "#ffffff",
                 "linecolor": "rgba(128, 128, 128, 0.2)",
             },
-            yaxis={
+            "yaxis": {
                 "showgrid": True,
                 "gridcolor": "rgba(128, 128, 128, 0.2)",
                 "color": "#ffffff",
                 "linecolor": "rgba(128, 128, 128, 0.2)",
             },
-            hovermode="x unified",
-            hoverlabel={
+            "hovermode": "x unified",
+            "hoverlabel": {
                 "bgcolor": "white",
-                "font_color": "black",
+                "font": {"color": "black"},
             },
-        )
-    )
+        }
+    }
+)
+DARK_TEMPLATE_JSON = DARK_TEMPLATE.json
+
 
+def get_dark_template():
+    """Returns a Plotly template configured for dark theme."""
+    import plotly.graph_objects as go
+
+    return go.layout.Template(json.loads(DARK_TEMPLATE_JSON))
+
+
+def title(text=None):
+    """Title object as Plotly serializes it; empty when there is no text"""
+    return {"text": text} if text is not None else {}
 
+
+@lru_cache(maxsize=64)
 def base_layout(x_title=None, y_title=None, y_format=".2f"):
     """Create a base layout for charts with dark theme.
 
+    Layouts are memoized by arguments and read-only; merge them into a new dict to add
+    keys, e.g. {**base_layout(...), "showlegend": True}.
+
     Args:
         x_title: X-axis title (optional, hidden for date axes)
         y_title: Y-axis title (optional)
         y_format: Y-axis tick format (default: ".2f")
 
     Returns:
-        dict: Plotly layout configuration
+        Frozen: Plotly layout configuration
     """
     # Hide x-axis title for date/time axes
     if x_title and x_title.lower() in ["date", "time", "timestamp", "datetime"]:
         x_title = None
 
-    return {
-        "template": get_dark_template(),
-        "xaxis": {"title": x_title, "showgrid": False},
-        "yaxis": {"title": y_title, "tickformat": y_format},
-        "margin": {"b": 40, "l": 80, "r": 20, "t": 40},
-        "hovermode": "x unified",
-    }
+    return freeze(
+        {
+            "template": DARK_TEMPLATE,
+            "xaxis": {"title": title(x_title), "showgrid": False},
+            "yaxis": {"title": title(y_title), "tickformat": y_format},
+            "margin": {"b": 40, "l": 80, "r": 20, "t": 40},
+            "hovermode": "x unified",
+        }
+    )
+
+
+def scatter(x, y, **properties):
+    """Scatter trace, equivalent to go.Scatter(x=x, y=y, **properties)
+
+    Properties must already be in Plotly's nested form (e.g. line={"color": ...}, not
+    line_color=...), as they are not validated.
+    """
+    return {**properties, "x": list(x), "y": list(y), "type": "scatter"}
+
+
+def figure(data, layout):
+    """Figure dict with the given traces and layout, like go.Figure(data, layout)"""
+    return {"data": list(data), "layout": layout}
+
+
+def figure_json(fig) -> str:
+    """Serialize a figure dict to JSON, like fig.to_json() for a go.Figure
+
+    Frozen layout fragments (the template, axes from base_layout, ...) are spliced in
+    from their pre-serialized JSON.
+    """
+    layout = ",".join(
+        f"{to_json(key)}:{value.json if isinstance(value, Frozen) else to_json(value)}"
+        for key, value in fig["layout"].items()
+    )
+    return f'{{"data":{to_json(fig["data"])},"layout":{{{layout}}}}}'
@@ -0,0 +1,18 @@
+"""Response classes for widget endpoints."""
+
+from fastapi.responses import Response
+
+
+class RawJSONResponse(Response):
+    """JSON response whose content is already serialized.
+
+    The content is sent as is, so JSON produced elsewhere (e.g. fig.to_json()) is not
+    parsed and encoded again by FastAPI.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: str | bytes) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return content.encode("utf-8")
@@ -0,0 +1,148 @@
+"""Cross-request micro-batching of symbols.
+
+Single-symbol requests for the same dataset that arrive within a short window are
+collected and sent upstream as one comma-joined multi-symbol request. The records in
+the response are then handed back to each waiter by symbol.
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Awaitable, Callable
+
+import httpx
+
+from vianexus.deadline import SharedDeadline, shared_context
+from vianexus.ratelimit import RateLimitExceeded
+from vianexus.resilience import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# Errors an upstream fetch is expected to fail with: transport errors and bad statuses,
+# an open circuit breaker, a shedding rate limiter, timeouts and undecodable payloads
+FETCH_ERRORS = (httpx.HTTPError, CircuitOpenError, RateLimitExceeded, TimeoutError, ValueError)
+
+
+class _Batch:
+    """Pending requests sharing one upstream request, by symbol"""
+
+    def __init__(self):
+        self.futures: dict[str, list[asyncio.Future]] = {}
+        self.deadline = SharedDeadline()
+        self.task: asyncio.Task | None = None
+
+    def waiting(self):
+        """Yield the futures that nobody has resolved or cancelled yet"""
+        for futures in self.futures.values():
+            for future in futures:
+                if not future.done():
+                    yield future
+
+
+class SymbolBatcher:
+    """Collect pending single-symbol requests and fetch them in one upstream call.
+
+    Requests are grouped by `last` since it applies to the whole upstream request.
+    A batch is flushed when its window elapses or it reaches max_symbols. The flush runs
+    in a fresh context under the latest deadline of the requests in the batch, and is
+    cancelled once none of them is waiting for it anymore.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[list[str], int], Awaitable[list[Any]]],
+        record_symbol: Callable[[Any], str],
+        window: float,
+        max_symbols: int,
+    ):
+        """
+        Args:
+            fetch: Coroutine function fetching records for (symbols, last)
+            record_symbol: Returns the symbol a fetched record belongs to
+            window: Seconds to wait for more symbols before flushing a batch
+            max_symbols: Flush a batch as soon as it holds this many symbols
+        """
+        self._fetch = fetch
+        self._record_symbol = record_symbol
+        self.window = window
+        self.max_symbols = max_symbols
+        self._pending: dict[int, _Batch] = {}
+        self._timers: dict[int, asyncio.TimerHandle] = {}
+        self._running: set[asyncio.Task] = set()
+
+    async def submit(self, symbol: str, last: int = 1) -> list[Any]:
+        """Queue a symbol for the next batch and wait for its records
+
+        Args:
+            symbol: Normalized stock symbol
+            last: Number of historical records to fetch
+
+        Returns:
+            The records for this symbol from the batched response
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._pending.get(last)
+        if batch is None:
+            batch = self._pending[last] = _Batch()
+        batch.futures.setdefault(symbol, []).append(future)
+        waiter = batch.deadline.join()
+
+        if len(batch.futures) >= self.max_symbols:
+            self._flush(last)
+        elif last not in self._timers:
+            self._timers[last] = loop.call_later(self.window, self._flush, last)
+        try:
+            return await future
+        finally:
+            batch.deadline.leave(waiter)
+            if not batch.deadline and batch.task is not None and not batch.task.done():
+                batch.task.cancel()
+
+    def _flush(self, last: int):
+        """Send the pending batch for `last` upstream"""
+        timer = self._timers.pop(last, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(last, None)
+        if batch is None or not batch.deadline:
+            # Every request in the batch gave up before it was sent
+            return
+        batch.task = asyncio.get_running_loop().create_task(
+            self._run(batch, last), context=shared_context(batch.deadline)
+        )
+        self._running.add(batch.task)
+        batch.task.add_done_callback(lambda done: self._finished(batch, done))
+
+    async def _run(self, batch: _Batch, last: int):
+        symbols = [
+            symbol
+            for symbol, futures in batch.futures.items()
+            if any(not future.done() for future in futures)
+        ]
+        logger.debug(f"Fetching batch of {len(symbols)} symbols (last={last})")
+        try:
+            records = await self._fetch(symbols, last)
+        except FETCH_ERRORS as e:
+            for future in batch.waiting():
+                future.set_exception(e)
+            return
+
+        by_symbol = defaultdict(list)
+        for record in records:
+            by_symbol[self._record_symbol(record).upper()].append(record)
+        for symbol, futures in batch.futures.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(by_symbol.get(symbol, []))
+
+    def _finished(self, batch: _Batch, task: asyncio.Task):
+        """Make sure no waiter is left hanging if the batch was cancelled or crashed"""
+        self._running.discard(task)
+        if task.cancelled():
+            for future in batch.waiting():
+                future.cancel()
+        elif task.exception() is not None:
+            logger.error(f"Batch fetch failed unexpectedly: {task.exception()!r}")
+            for future in batch.waiting():
+                future.set_exception(task.exception())
@@ -0,0 +1,140 @@
+"""In-process TTL cache with LRU eviction and a memory budget in bytes.
+
+Values are kept as already-parsed objects, so a hit skips both the network and
+schema validation. Every entry carries its own TTL (set per dataset) and an
+approximate size used to keep the whole cache within its byte budget.
+
+Entries can outlive their (soft) TTL up to a hard TTL. In that window they are
+still returned by lookup() but flagged as stale, so callers can serve them while
+refreshing in the background (stale-while-revalidate).
+"""
+
+import logging
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def record_nbytes(record: Any) -> int:
+    """Approximate memory held by one record: the object, its attributes and their values
+
+    Works for pydantic models (including the set of fields they were given) and plain
+    dicts. Values are measured one level deep, which covers the flat upstream records.
+    """
+    attrs = record if isinstance(record, dict) else getattr(record, "__dict__", {})
+    nbytes = sys.getsizeof(record) + sum(sys.getsizeof(value) for value in attrs.values())
+    if attrs is not record:
+        nbytes += sys.getsizeof(attrs)
+    fields_set = getattr(record, "__pydantic_fields_set__", None)
+    if fields_set is not None:
+        nbytes += sys.getsizeof(fields_set)
+    return nbytes
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    nbytes: int
+    expires_at: float
+    stale_until: float
+
+    @property
+    def is_stale(self) -> bool:
+        """True once the entry is past its soft TTL"""
+        return self.expires_at <= time.monotonic()
+
+
+class TTLCache:
+    """Least-recently-used cache bounded by total size, with per-entry expiry"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, CacheEntry] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, key: Hashable) -> CacheEntry | None:
+        """Return the entry for key, fresh or stale, or None if missing or past its hard TTL"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.stale_until <= time.monotonic():
+            # Expired entries stay until evicted, as a fallback while upstream is down
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        if entry.is_stale:
+            self.stale_hits += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def peek(self, key: Hashable, expired_ok: bool = False) -> CacheEntry | None:
+        """Return the entry for key without counting a hit or refreshing its LRU position
+
+        Args:
+            key: Cache key
+            expired_ok: Also return an entry past its hard TTL that has not been dropped yet
+        """
+        entry = self._entries.get(key)
+        if entry is None or (not expired_ok and entry.stale_until <= time.monotonic()):
+            return None
+        return entry
+
+    def get(self, key: Hashable) -> Any | None:
+        """Return the cached value for key, or None if it is missing or stale"""
+        entry = self.lookup(key)
+        if entry is None or entry.is_stale:
+            return None
+        return entry.value
+
+    def set(self, key: Hashable, value: Any, ttl: float, nbytes: int, hard_ttl: float = 0):
+        """Store a value, evicting least recently used entries to stay within budget
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Seconds the value stays fresh
+            nbytes: Approximate size of the value in bytes
+            hard_ttl: Seconds the value may still be served stale (defaults to ttl)
+        """
+        if ttl <= 0 or nbytes > self.max_bytes:
+            return
+        self.delete(key)
+        now = time.monotonic()
+        self._entries[key] = CacheEntry(value, nbytes, now + ttl, now + max(ttl, hard_ttl))
+        self.nbytes += nbytes
+        while self.nbytes > self.max_bytes:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+            logger.debug(f"Evicted {evicted_key} from cache ({evicted.nbytes} bytes)")
+
+    def delete(self, key: Hashable):
+        """Remove key from the cache if present"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry.nbytes
+
+    def clear(self):
+        """Remove every entry"""
+        self._entries.clear()
+        self.nbytes = 0
+
+
+# Process-wide cache shared by all datasets
+dataset_cache = TTLCache(max_bytes=settings.cache_max_bytes)
+
+# Rendered widget responses, stored with the version of the data they were built from
+response_cache = TTLCache(max_bytes=settings.response_cache_max_bytes)
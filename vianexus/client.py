@@ -0,0 +1,68 @@
+"""Shared HTTP client for the Vianexus API.
+
+A single pooled httpx.AsyncClient is kept for the lifetime of the process so that
+every dataset request reuses keep-alive connections instead of opening a new
+TCP+TLS connection per call. The FastAPI lifespan in main.py opens and closes it.
+"""
+
+import logging
+
+import httpx
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_client: httpx.AsyncClient | None = None
+
+
+def _build_client(transport: httpx.AsyncBaseTransport | None = None) -> httpx.AsyncClient:
+    """Create an AsyncClient configured from the connection pool settings."""
+    limits = httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry,
+    )
+    timeout = httpx.Timeout(
+        settings.http_timeout,
+        connect=settings.http_connect_timeout,
+        pool=settings.http_pool_timeout,
+    )
+    return httpx.AsyncClient(limits=limits, timeout=timeout, transport=transport)
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it on first use if it is not open yet."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def open_client(transport: httpx.AsyncBaseTransport | None = None) -> httpx.AsyncClient:
+    """Open the shared client. Called on application startup.
+
+    Args:
+        transport: Transport to send requests through instead of the network, e.g. an
+            httpx.ASGITransport wrapping a mock API in load tests
+    """
+    global _client
+    if transport is not None:
+        await close_client()
+        _client = _build_client(transport)
+    client = get_client()
+    logger.info(
+        "Opened Vianexus HTTP client (max_connections=%s, max_keepalive=%s)",
+        settings.http_max_connections,
+        settings.http_max_keepalive_connections,
+    )
+    return client
+
+
+async def close_client():
+    """Close the shared client and release pooled connections. Called on shutdown."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logger.info("Closed Vianexus HTTP client")
@@ -1,73 +1,534 @@
+import asyncio
+import contextvars
+import itertools
 import json
-import httpx
 import logging
+import sqlite3
+from collections import defaultdict
+from functools import partial
+from typing import Awaitable, Callable, Hashable
+from dataclasses import dataclass, field
+import httpx
+from anyio import from_thread
+from pydantic import BaseModel, TypeAdapter
 from config import settings
+from vianexus.batching import SymbolBatcher
+from vianexus.cache import dataset_cache, record_nbytes
+from vianexus.client import get_client
+from vianexus.deadline import (
+    DeadlineExceeded,
+    cut_short,
+    deadline,
+    remaining,
+    request_timeout,
+)
+from vianexus.hedging import Hedger
+from vianexus.ratelimit import acquire_all, buckets_for
+from vianexus.resilience import (
+    RETRYABLE_STATUS_CODES,
+    CircuitBreaker,
+    CircuitOpenError,
+    backoff_delay,
+    retry_after,
+)
 from vianexus.schemas import StockStatsData, VnxQuoteData
+from vianexus.singleflight import SingleFlight
+from vianexus.store import HistoryStore, MemoryHistoryStore, trading_days_since
+
+logger = logging.getLogger(__name__)
+
+# Records of each response measured for the running average of the record size
+RECORD_SIZE_SAMPLES = 4
+# Size of the reference to each record in a cached list
+LIST_SLOT_NBYTES = 8
+
+
+def normalize_symbols(symbols: list[str]) -> list[str]:
+    """Normalize ticker symbols so equivalent requests share the same key"""
+    return [symbol.strip().upper() for symbol in symbols]
+
+
+@dataclass(frozen=True)
+class CachedData:
+    """Records cached for a set of symbols, as returned for the given `last`"""
+
+    last: int
+    records: list
+    version: Hashable = None
+    # Versions of the smaller ranges answered from these records, by `last`
+    subversions: dict[int, Hashable] = field(default_factory=dict, compare=False)
 
 
 class Dataset:
-    def __init__(self, namespace: str, dataset: str):
+    # Record attribute holding the symbol, used to split batched responses per symbol.
+    # Batching is only enabled for datasets that set it.
+    symbol_field: str | None = None
+    # Record attribute ordering records in time. When set, smaller `last` queries are
+    # answered from cached results of larger ones.
+    recency_field: str | None = None
+    # Model the records are validated against
+    schema: type[BaseModel] | None = None
+    # Record attribute holding the time a record was last updated upstream, used
+    # together with recency_field to tell versions of the data apart
+    updated_field: str | None = None
+
+    def __init__(
+        self, namespace: str, dataset: str, cache_ttl: float = 0, cache_hard_ttl: float = 0
+    ):
         self.base_url = settings.vianexus_base_url
         self.api_key = settings.vianexus_api_key
         self.namespace = namespace
         self.dataset = dataset
+        self.cache_ttl = cache_ttl
+        self.cache_hard_ttl = cache_hard_ttl
+        self._adapter = TypeAdapter(list[self.schema]) if self.schema else None
+        self._cache = dataset_cache
+        self._refreshes: set[asyncio.Task] = set()
+        # Running average of the in-memory size of one record, used to size cache entries
+        self._record_nbytes = 0.0
+        self._records_sized = 0
+        self._flights = SingleFlight()
+        self._responses = itertools.count()
+        self._breaker = CircuitBreaker(
+            f"{namespace}/{dataset}",
+            failure_rate=settings.breaker_failure_rate,
+            min_calls=settings.breaker_min_calls,
+            window=settings.breaker_window,
+            open_seconds=settings.breaker_open_seconds,
+        )
+        self._buckets = buckets_for(self.api_key, namespace, dataset)
+        self._batcher = None
+        if self.symbol_field and settings.batch_window_ms > 0:
+            self._batcher = SymbolBatcher(
+                self._fetch,
+                self._record_symbol,
+                window=settings.batch_window_ms / 1000,
+                max_symbols=settings.batch_max_symbols,
+            )
 
-    def make_request(self, symbols: list[str], last: int = 1):
-        """Make a request to the Vianexus API to get the data for the dataset for the given symbols"""
+    async def _get(self, symbols: list[str], last: int) -> httpx.Response:
+        """Send the GET request for the given symbols through the shared pooled client
+
+        Every attempt takes a token from the API key and dataset rate limiters.
+        Transport errors and retryable statuses (429, 5xx) are retried with jittered
+        exponential backoff, waiting at least as long as a 429's Retry-After asks; a 429
+        asking for more than the maximum backoff is not retried. Every attempt is
+        recorded by the dataset's circuit breaker.
+        Timeouts are bounded by the current deadline, and no attempt is started once it
+        has passed or retried when the backoff would outlast it. Timeouts shortened by
+        the deadline are not counted as upstream failures; if the deadline was extended
+        meanwhile (a later caller joined a shared load), the request is sent again.
+
+        Raises:
+            DeadlineExceeded: If the deadline passes before a request or retry can be sent,
+                or cuts a request short
+            CircuitOpenError: If the circuit breaker is open
+            RateLimitExceeded: If a rate limiter sheds the request
+            httpx.HTTPError: If the request still fails after the last retry
+        """
         url = f"{self.base_url}/data/{self.namespace}/{self.dataset}/{','.join(symbols)}"
         params = {
             "token": self.api_key,
             "last": last,
         }
-        response = httpx.get(url, params=params, timeout=10)
-        return response.json()
+        attempt = 0
+        while True:
+            left = remaining()
+            if left is not None and left <= 0:
+                raise DeadlineExceeded(f"Deadline exceeded before requesting {self.dataset}")
+            generation = self._breaker.allow()
+            try:
+                await acquire_all(self._buckets, max_wait=left)
+                timeout = request_timeout()
+                response = await get_client().get(url, params=params, timeout=timeout)
+                if response.status_code in RETRYABLE_STATUS_CODES:
+                    response.raise_for_status()
+            except httpx.HTTPError as e:
+                left = remaining()
+                if isinstance(e, httpx.TimeoutException) and cut_short(e, timeout):
+                    # Cut short by the deadline, which says nothing about upstream
+                    self._breaker.release(generation)
+                    if left is not None and left <= 0:
+                        raise DeadlineExceeded(
+                            f"Deadline exceeded waiting for {self.dataset}"
+                        ) from e
+                    continue
+                self._breaker.record_failure(generation)
+                if attempt >= settings.http_retries:
+                    raise
+                delay = backoff_delay(
+                    attempt, settings.http_retry_backoff, settings.http_retry_backoff_max
+                )
+                if isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 429:
+                    # Throttled, wait as long as upstream asks, but not longer than we would
+                    wait = retry_after(e.response)
+                    if wait is not None:
+                        if wait > settings.http_retry_backoff_max:
+                            raise
+                        delay = max(delay, wait)
+                if left is not None and delay >= left:
+                    raise DeadlineExceeded(
+                        f"Deadline exceeded before retrying {self.dataset}"
+                    ) from e
+                reason = (
+                    f"status {e.response.status_code}"
+                    if isinstance(e, httpx.HTTPStatusError)
+                    else type(e).__name__
+                )
+                logger.warning(
+                    f"Request to {self.namespace}/{self.dataset} failed ({reason}), "
+                    f"retrying in {delay:.2f}s"
+                )
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                self._breaker.release(generation)
+                raise
+            self._breaker.record_success(generation)
+            return response
 
-    def data(self, symbols: list[str], last: int = 1):
-        """Get historical data for the dataset for the given symbols
+    def decode(self, content: bytes) -> list:
+        """Decode a raw API response into records
 
-        Args:
-            symbols: List of stock symbols
-            last: Number of historical records to fetch (default: 30 for ~1 month)
+        With a schema, the bytes are parsed and validated into model objects in a single
+        pass. Without one, the decoded JSON is returned unchanged.
+        """
+        if self._adapter is None:
+            return json.loads(content)
+        return self._adapter.validate_json(content)
+
+    async def _chunked(
+        self, symbols: list[str], fetch: Callable[[list[str]], Awaitable[list]]
+    ) -> list:
+        """Fetch symbols in chunks of at most symbol_chunk_size, concurrently
+
+        Returns:
+            The records of every chunk, concatenated in the order of the symbols
+        """
+        size = settings.symbol_chunk_size
+        if size <= 0 or len(symbols) <= size:
+            return await fetch(symbols)
+
+        semaphore = asyncio.Semaphore(max(1, settings.symbol_chunk_concurrency))
+
+        async def limited(chunk: list[str]) -> list:
+            async with semaphore:
+                return await fetch(chunk)
+
+        tasks = [
+            asyncio.ensure_future(limited(symbols[start : start + size]))
+            for start in range(0, len(symbols), size)
+        ]
+        logger.debug(f"Fetching {len(symbols)} {self.dataset} symbols in {len(tasks)} chunks")
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            # One chunk failed or the caller gave up, the other chunks are not needed
+            for task in tasks:
+                task.cancel()
+            raise
+        return [record for records in results for record in records]
+
+    async def _fetch(self, symbols: list[str], last: int):
+        """Request and decode the data for the given symbols, in chunks if there are many"""
+        return await self._chunked(symbols, partial(self._fetch_chunk, last=last))
+
+    async def _fetch_chunk(self, symbols: list[str], last: int) -> list:
+        """Request and decode the data for one chunk of symbols"""
+        response = await self._get(symbols, last)
+        self._log_payload(response.content)
+        records = self.decode(response.content)
+        self._size_records(records)
+        return records
+
+    def _size_records(self, records: list):
+        """Fold a sample of the records into the running average of the record size"""
+        step = max(1, len(records) // RECORD_SIZE_SAMPLES)
+        for record in records[::step][:RECORD_SIZE_SAMPLES]:
+            nbytes = record_nbytes(record)
+            self._records_sized += 1
+            self._record_nbytes += (nbytes - self._record_nbytes) / self._records_sized
+
+    def _log_payload(self, content: bytes):
+        """Log the first bytes of a sampled response payload at DEBUG level"""
+        rate = settings.payload_log_sample_rate
+        if rate <= 0 or next(self._responses) % rate or not logger.isEnabledFor(logging.DEBUG):
+            return
+        limit = settings.payload_log_max_bytes
+        truncated = f" (truncated, {len(content)} bytes)" if len(content) > limit else ""
+        logger.debug(
+            f"{self.dataset} payload{truncated}: {content[:limit].decode(errors='replace')}"
+        )
+
+    def _record_symbol(self, record) -> str:
+        """Return the symbol a parsed record belongs to"""
+        return getattr(record, self.symbol_field)  # type: ignore[arg-type]
+
+    async def _load(self, symbols: list[str], last: int):
+        """Fetch the data, batching single-symbol requests with other callers if enabled"""
+        if self._batcher is not None and len(symbols) == 1:
+            return await self._batcher.submit(symbols[0], last)
+        return await self._fetch(symbols, last)
+
+    def _most_recent(self, records: list, last: int) -> list:
+        """Keep the `last` most recent records of each symbol, in their original order"""
+        by_symbol = defaultdict(list)
+        for index, record in enumerate(records):
+            symbol = self._record_symbol(record) if self.symbol_field else None
+            by_symbol[symbol].append(index)
+
+        keep = set()
+        for indexes in by_symbol.values():
+            indexes.sort(key=lambda i: getattr(records[i], self.recency_field), reverse=True)
+            keep.update(indexes[:last])
+        return [record for index, record in enumerate(records) if index in keep]
+
+    def _cached(self, cached: CachedData, last: int) -> list | None:
+        """Answer a query for `last` from a cached result, if it covers it"""
+        if cached.last == last:
+            return cached.records
+        if self.recency_field is not None and cached.last > last:
+            return self._most_recent(cached.records, last)
+        return None
+
+    def record_version(self, records: list) -> Hashable:
+        """Version of a set of records, which changes whenever new or updated rows arrive
+
+        Returns:
+            The number of records and their latest recency and update values
+        """
+        fields = [field for field in (self.recency_field, self.updated_field) if field]
+        latest = [max((getattr(r, field) for r in records), default=None) for field in fields]
+        return (len(records), *latest)
+
+    def version(self, symbols: list[str], last: int = 1) -> Hashable | None:
+        """Version of the fresh cached data answering a query, without loading anything
+
+        Does not count as a cache hit or refresh the entry's LRU position, so it can be
+        used to check whether something derived from the data is still current.
+
+        Returns:
+            The version of the cached data, or None if the query is not answered from a
+            fresh cache entry
+        """
+        key = (self.namespace, self.dataset, tuple(normalize_symbols(symbols)))
+        entry = self._cache.peek(key)
+        if entry is None or entry.is_stale:
+            return None
+        cached = entry.value
+        if cached.last == last:
+            return cached.version
+        if last not in cached.subversions:
+            # Answered from a larger range, version the part that answers it
+            records = self._cached(cached, last)
+            cached.subversions[last] = self.record_version(records) if records is not None else None
+        return cached.subversions[last]
+
+    async def _load_and_cache(self, key: tuple, symbols: list[str], last: int):
+        """Load the data and store it in the cache under key
+
+        Empty results (e.g. unknown symbols) are not cached, so data showing up upstream
+        is picked up by the next request.
         """
-        data = self.make_request(symbols, last=last)
-        logging.debug(f"Data: \n{json.dumps(data, indent=4)}")
+        data = await self._load(symbols, last)
+        if not data:
+            return data
+        current = self._cache.peek(key)
+        # Keep a fresh larger range, it already answers this query
+        if current is None or current.is_stale or current.value.last <= last:
+            if not self._records_sized:
+                # Loaded without a fresh fetch (e.g. from the history store)
+                self._size_records(data)
+            nbytes = int(len(data) * (self._record_nbytes + LIST_SLOT_NBYTES))
+            self._cache.set(
+                key,
+                CachedData(last, data, self.record_version(data)),
+                ttl=self.cache_ttl,
+                nbytes=nbytes,
+                hard_ttl=self.cache_hard_ttl,
+            )
         return data
 
+    def _revalidate(self, key: tuple, symbols: list[str], last: int):
+        """Refresh a stale cache entry in the background, unless a refresh is already running"""
+        if (key, last) in self._flights:
+            return
+        # Run outside the caller's context, the refresh has its own time budget
+        task = asyncio.get_running_loop().create_task(
+            self._refresh(key, symbols, last), context=contextvars.Context()
+        )
+        self._refreshes.add(task)
+        task.add_done_callback(self._refresh_done)
 
-class StockStats(Dataset):
-    def __init__(self):
-        super().__init__("CORE", "STOCK_STATS_US")
+    async def _refresh(self, key: tuple, symbols: list[str], last: int):
+        with deadline(settings.refresh_timeout):
+            return await self._flights.do((key, last), self._load_and_cache, key, symbols, last)
+
+    def _refresh_done(self, task: asyncio.Task):
+        self._refreshes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Background refresh of {self.dataset} failed: {task.exception()}")
 
-    def data(self, symbols: list[str], last: int = 1) -> list[StockStatsData]:
-        """Get stock statistics data with validated schema
+    async def _load_shared(self, key: tuple, symbols: list[str], last: int):
+        """Join or start the shared load for key, waiting no longer than the deadline
+
+        The shared load runs under the latest deadline of the callers waiting on it, so
+        a caller giving up early does not cut it short for the others, and is cancelled
+        once every caller has given up.
+        """
+        try:
+            return await asyncio.wait_for(
+                self._flights.do((key, last), self._load_and_cache, key, symbols, last),
+                timeout=remaining(),
+            )
+        except CircuitOpenError:
+            # Upstream is failing, fall back to whatever is still cached
+            fallback = self._cache.peek(key, expired_ok=True)
+            data = self._cached(fallback.value, last) if fallback is not None else None
+            if data is None:
+                raise
+            logger.warning(f"Serving expired {self.dataset} data, circuit breaker is open")
+            return data
+
+    async def adata(self, symbols: list[str], last: int = 1, timeout: float | None = None):
+        """Get historical data for the dataset for the given symbols
+
+        Results are cached for the dataset's TTL, and a cached result for a larger `last`
+        also answers smaller ones. Entries past the TTL but within the hard TTL are
+        returned immediately and refreshed in the background. On a miss, concurrent calls
+        for the same symbols and `last` share a single upstream request and parsed result.
+        Single-symbol calls may be batched with other symbols into one upstream request.
 
         Args:
             symbols: List of stock symbols
             last: Number of historical records to fetch (default: 1)
+            timeout: Time budget in seconds, propagated as a deadline to the upstream
+                requests (default: no deadline beyond an enclosing one)
 
-        Returns:
-            List of validated StockStatsData objects
+        Raises:
+            TimeoutError: If the data is not available within the time budget
         """
-        raw_data = super().data(symbols, last=last)
-        return [StockStatsData(**item) for item in raw_data]
+        symbols = normalize_symbols(symbols)
+        key = (self.namespace, self.dataset, tuple(symbols))
+        entry = self._cache.lookup(key)
+        data = self._cached(entry.value, last) if entry is not None else None
+        if data is not None:
+            if entry.is_stale:
+                # Refresh the whole cached range, not just the part asked for
+                self._revalidate(key, symbols, entry.value.last)
+        else:
+            with deadline(timeout):
+                data = await self._load_shared(key, symbols, last)
+        # Callers get their own list so the shared result cannot be mutated
+        return list(data)
 
+    def data(self, symbols: list[str], last: int = 1):
+        """Synchronous wrapper around adata()
+
+        Must be called from a worker thread (e.g. a sync FastAPI endpoint), the request
+        itself runs on the event loop that owns the shared client.
+        """
+        return from_thread.run(self.adata, symbols, last)
+
+
+class StockStats(Dataset):
+    symbol_field = "symbol"
+    recency_field = "date"
+    updated_field = "updated"
+    schema = StockStatsData
 
-class VnxQuote(Dataset):
     def __init__(self):
-        super().__init__("EDGE", "VNX_QUOTE")
+        super().__init__(
+            "CORE",
+            "STOCK_STATS_US",
+            cache_ttl=settings.stock_stats_cache_ttl,
+            cache_hard_ttl=settings.stock_stats_cache_hard_ttl,
+        )
+        if settings.history_store_path:
+            self._store = HistoryStore(
+                settings.history_store_path, settings.history_store_retention_days
+            )
+        else:
+            self._store = MemoryHistoryStore(
+                settings.history_memory_max_symbols, settings.history_store_retention_days
+            )
 
-    def data(self, symbols: list[str], last: int = 1) -> list[VnxQuoteData]:
-        """Get VNX quote data with validated schema
+    async def _call_store(self, method, *args):
+        """Call a history store method, off the event loop if it blocks
 
-        Args:
-            symbols: List of stock symbols
-            last: Number of historical records to fetch (default: 1)
+        Store errors are logged and reported as None so requests fall back to upstream.
+        """
+        try:
+            if self._store.blocking:
+                return await asyncio.to_thread(method, *args)
+            return method(*args)
+        except sqlite3.Error as e:
+            logger.warning(f"History store {method.__name__} failed for {args[0]}: {e}")
+            return None
 
-        Returns:
-            List of validated VnxQuoteData objects
+    async def _load(self, symbols: list[str], last: int):
+        """Load single-symbol history through the history store
+
+        Current history is served from the store. Otherwise, in incremental mode, only
+        the rows newer than the latest stored date are fetched and merged into the
+        stored history; if they do not connect to it the full range is fetched.
         """
-        raw_data = super().data(symbols, last=last)
-        return [VnxQuoteData(**item) for item in raw_data]
+        if len(symbols) != 1:
+            return await super()._load(symbols, last)
+
+        symbol = symbols[0]
+        rows = await self._call_store(self._store.read, symbol, last, self.cache_ttl)
+        if rows is not None:
+            return rows
+
+        if last > 1 and settings.stock_stats_incremental:
+            known = await self._call_store(self._store.latest, symbol)
+            if known is not None and known[1] >= last:
+                # Re-fetch the latest stored row too, so the new rows overlap the history
+                delta = min(last, trading_days_since(known[0]) + 1)
+                if delta < last:
+                    new_rows = await super()._load(symbols, delta)
+                    if new_rows:
+                        await self._call_store(self._store.write, symbol, delta, new_rows)
+                    rows = await self._call_store(self._store.read, symbol, last, self.cache_ttl)
+                    if rows is not None:
+                        return rows
+                    logger.debug(f"{symbol} history has a gap, fetching last={last}")
+
+        rows = await super()._load(symbols, last)
+        # An empty result says nothing about the history, so it is not stored
+        if rows:
+            await self._call_store(self._store.write, symbol, last, rows)
+        return rows
+
+
+class VnxQuote(Dataset):
+    symbol_field = "vnx_symbol"
+    recency_field = "vnx_timestamp"
+    schema = VnxQuoteData
+
+    def __init__(self):
+        super().__init__(
+            "EDGE",
+            "VNX_QUOTE",
+            cache_ttl=settings.vnx_quote_cache_ttl,
+            cache_hard_ttl=settings.vnx_quote_cache_hard_ttl,
+        )
+        self._hedger = None
+        if settings.vnx_quote_hedge:
+            self._hedger = Hedger(
+                "EDGE/VNX_QUOTE",
+                percentile=settings.vnx_quote_hedge_percentile,
+                min_delay=settings.vnx_quote_hedge_min_delay,
+                max_ratio=settings.vnx_quote_hedge_max_ratio,
+            )
+
+    async def _get(self, symbols: list[str], last: int) -> httpx.Response:
+        """Send the GET request, hedged with a second one if it is slow and hedging is on"""
+        if self._hedger is None:
+            return await super()._get(symbols, last)
+        return await self._hedger.run(partial(super()._get, symbols, last))
 
 
 stock_stats = StockStats()
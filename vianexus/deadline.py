@@ -0,0 +1,162 @@
+"""Request deadlines propagated from widget endpoints down to upstream requests.
+
+A deadline is an absolute time.monotonic() value held in a context variable, so it
+follows the request through the retry layer and into the tasks it creates (tasks copy
+the context they are created in). Work shared between requests (coalesced loads and
+batches) runs in a fresh context under a SharedDeadline: the latest deadline of the
+requests currently waiting on it, so it is given as long as its most patient waiter and
+no longer. HTTP timeouts are derived from whatever is left of the deadline.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import httpx
+
+from config import settings
+
+
+class Deadline:
+    """Fixed absolute deadline"""
+
+    __slots__ = ("at",)
+
+    def __init__(self, at: float):
+        self.at = at
+
+
+class SharedDeadline:
+    """Deadline of work shared by several requests: the latest of their deadlines
+
+    Requests join when they start waiting on the work and leave when they stop. While
+    any waiter has no deadline, neither does the work. A shared deadline is falsy once
+    every waiter has left.
+    """
+
+    def __init__(self):
+        self._waiters: list[Deadline | SharedDeadline | None] = []
+
+    def __bool__(self) -> bool:
+        return bool(self._waiters)
+
+    @property
+    def at(self) -> float | None:
+        latest = 0.0
+        for waiter in self._waiters:
+            if waiter is None or waiter.at is None:
+                return None
+            latest = max(latest, waiter.at)
+        return latest if self._waiters else None
+
+    def join(self) -> "Deadline | SharedDeadline | None":
+        """Add the deadline of the current context as a waiter
+
+        Returns:
+            The waiter, to pass to leave()
+        """
+        waiter = _deadline.get()
+        self._waiters.append(waiter)
+        return waiter
+
+    def leave(self, waiter: "Deadline | SharedDeadline | None"):
+        self._waiters.remove(waiter)
+
+
+_deadline: ContextVar[Deadline | SharedDeadline | None] = ContextVar(
+    "vianexus_deadline", default=None
+)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when there is no time left to start or wait for an upstream request"""
+
+
+@contextmanager
+def deadline(seconds: float | None):
+    """Limit the enclosed block to `seconds`, or to an outer deadline if that is sooner
+
+    Args:
+        seconds: Time budget in seconds, None keeps the current deadline
+    """
+    if seconds is None:
+        yield
+        return
+    at = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None and current.at is not None:
+        at = min(at, current.at)
+    token = _deadline.set(Deadline(at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def shared_context(shared: SharedDeadline) -> contextvars.Context:
+    """Fresh context, without the caller's context variables, whose deadline is `shared`"""
+    context = contextvars.Context()
+    context.run(_deadline.set, shared)
+    return context
+
+
+def remaining() -> float | None:
+    """Seconds left before the current deadline, or None if there is no deadline"""
+    current = _deadline.get()
+    at = current.at if current is not None else None
+    if at is None:
+        return None
+    return at - time.monotonic()
+
+
+def configured_timeout() -> httpx.Timeout:
+    """Connect/read/write/pool timeouts from the settings, without a deadline"""
+    return httpx.Timeout(
+        connect=settings.http_connect_timeout,
+        read=settings.http_timeout,
+        write=settings.http_timeout,
+        pool=settings.http_pool_timeout,
+    )
+
+
+def request_timeout() -> httpx.Timeout:
+    """Connect/read/write/pool timeouts for the next request, bounded by the deadline
+
+    Raises:
+        DeadlineExceeded: If the deadline has already passed
+    """
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("Deadline exceeded before sending the request")
+    timeout = configured_timeout()
+    if left is None:
+        return timeout
+    return httpx.Timeout(
+        connect=min(timeout.connect, left),
+        read=min(timeout.read, left),
+        write=min(timeout.write, left),
+        pool=min(timeout.pool, left),
+    )
+
+
+# Timeout of each phase of a request, by the error raised when it expires
+_PHASES = {
+    httpx.ConnectTimeout: "connect",
+    httpx.ReadTimeout: "read",
+    httpx.WriteTimeout: "write",
+    httpx.PoolTimeout: "pool",
+}
+
+
+def cut_short(error: httpx.TimeoutException, timeout: httpx.Timeout) -> bool:
+    """Whether a request timed out because its timeout was shortened to fit the deadline
+
+    Args:
+        error: Timeout the request failed with
+        timeout: Timeouts the request was sent with, from request_timeout()
+    """
+    phase = _PHASES.get(type(error))
+    if phase is None:
+        return False
+    return getattr(timeout, phase) < getattr(configured_timeout(), phase)
@@ -0,0 +1,83 @@
+"""Hedged requests for latency-critical upstream calls.
+
+If a request has not answered within a delay derived from recent latencies (e.g. the
+95th percentile), a second identical request is sent and whichever answers first is
+used; the other one is cancelled. The share of hedged requests is capped so hedging
+adds a bounded amount of extra upstream load.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+# Latency samples needed before the percentile is trusted over the minimum delay
+MIN_SAMPLES = 20
+
+
+class Hedger:
+    """Run calls with a percentile-derived hedge delay and a cap on extra load"""
+
+    def __init__(
+        self, name: str, percentile: float, min_delay: float, max_ratio: float, window: int = 500
+    ):
+        """
+        Args:
+            name: Name used in log messages
+            percentile: Latency percentile (0-100) after which a hedge request is sent
+            min_delay: Lower bound of the hedge delay in seconds
+            max_ratio: Maximum fraction of calls that may send a hedge request
+            window: Number of recent latencies the percentile is computed over
+        """
+        self.name = name
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_ratio = max_ratio
+        self._latencies: deque[float] = deque(maxlen=window)
+        self.calls = 0
+        self.hedged = 0
+
+    def delay(self) -> float:
+        """Seconds to wait for the first request before sending a hedge request"""
+        if len(self._latencies) < MIN_SAMPLES:
+            return self.min_delay
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return max(self.min_delay, ordered[index])
+
+    async def run(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Await call(), sending a second call() if the first is slower than the hedge delay
+
+        Args:
+            call: Coroutine function performing the request; must be safe to call twice
+
+        Returns:
+            The result of the first call to succeed
+        """
+        self.calls += 1
+        started = time.monotonic()
+        pending = {asyncio.ensure_future(call())}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.delay())
+            if not done and self.hedged < self.max_ratio * self.calls:
+                self.hedged += 1
+                logger.debug(f"Hedging slow {self.name} request")
+                pending.add(asyncio.ensure_future(call()))
+
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        # The primary's latency, or a lower bound of it if the hedge won;
+                        # timing the hedge from its own start would drag the delay down
+                        self._latencies.append(time.monotonic() - started)
+                        return task.result()
+                if not pending:
+                    # Every request failed, report the last error
+                    return done.pop().result()
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
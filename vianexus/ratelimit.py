@@ -0,0 +1,185 @@
+"""Client-side token-bucket rate limiting for the Vianexus API quota.
+
+Requests take a token from the bucket of their API key and from the bucket of their
+dataset (if one is configured). When a bucket is empty, requests queue in arrival
+order until a token is available; requests that would queue past the configured
+limits are shed with RateLimitExceeded instead of being sent upstream.
+"""
+
+import asyncio
+import logging
+import time
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request is shed instead of queued by a rate limiter"""
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second, holding at most `burst` tokens.
+
+    Tokens are reserved on arrival, so waiters are served in order: a request that finds
+    the bucket empty borrows a token and sleeps until the refill has paid it back.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, max_queue: int, max_wait: float):
+        """
+        Args:
+            name: Name reported in stats and log messages
+            rate: Tokens added per second
+            burst: Maximum number of tokens in the bucket
+            max_queue: Maximum number of requests waiting for a token
+            max_wait: Maximum seconds a request may wait for a token
+        """
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self.queue_depth = 0
+        self.acquired = 0
+        self.shed = 0
+        self.total_wait = 0.0
+        self.max_wait_seen = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, max_wait: float | None = None):
+        """Take a token, waiting for one if needed
+
+        Args:
+            max_wait: Tighter bound than the bucket's max_wait for this request (seconds)
+
+        Raises:
+            RateLimitExceeded: If the queue is full or the wait would exceed max_wait
+        """
+        limit = self.max_wait if max_wait is None else min(self.max_wait, max_wait)
+        self._refill()
+        self._tokens -= 1
+        wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0 and (self.queue_depth >= self.max_queue or wait > limit):
+            self._tokens += 1
+            self.shed += 1
+            raise RateLimitExceeded(
+                f"Rate limit for {self.name} exceeded "
+                f"(queue depth {self.queue_depth}, wait {wait:.2f}s)"
+            )
+
+        if wait > 0:
+            logger.debug(f"Waiting {wait:.3f}s for a {self.name} token")
+            self.queue_depth += 1
+            try:
+                await asyncio.sleep(wait)
+            except BaseException:
+                # Hand the reserved token back to the requests behind us
+                self._tokens += 1
+                raise
+            finally:
+                self.queue_depth -= 1
+
+        self.acquired += 1
+        self.total_wait += wait
+        self.max_wait_seen = max(self.max_wait_seen, wait)
+
+    def release(self):
+        """Give back a token taken by acquire that ended up unused"""
+        self._refill()
+        self._tokens = min(self.burst, self._tokens + 1)
+
+    def stats(self) -> dict:
+        """Snapshot of the bucket state, for sizing the limits"""
+        self._refill()
+        return {
+            "name": self.name,
+            "rate": self.rate,
+            "burst": self.burst,
+            "tokens": round(max(self._tokens, 0.0), 3),
+            "queue_depth": self.queue_depth,
+            "acquired": self.acquired,
+            "shed": self.shed,
+            "avg_wait": self.total_wait / self.acquired if self.acquired else 0.0,
+            "max_wait": self.max_wait_seen,
+        }
+
+
+# Buckets by API key and by "NAMESPACE/DATASET"
+_key_buckets: dict[str, TokenBucket] = {}
+_dataset_buckets: dict[str, TokenBucket | None] = {}
+
+
+def _parse_dataset_limits(value: str) -> dict[str, tuple[float, int]]:
+    """Parse "NAMESPACE/DATASET:rate[:burst]" comma-separated pairs from settings"""
+    limits = {}
+    for item in value.split(","):
+        item = item.strip()
+        if ":" not in item:
+            continue
+        name, _, limit = item.partition(":")
+        rate, _, burst = limit.partition(":")
+        if float(rate) > 0:
+            limits[name.strip().upper()] = (float(rate), int(burst or max(1, float(rate))))
+    return limits
+
+
+def _bucket(name: str, rate: float, burst: int) -> TokenBucket:
+    return TokenBucket(
+        name,
+        rate=rate,
+        burst=burst,
+        max_queue=settings.rate_limit_max_queue,
+        max_wait=settings.rate_limit_max_wait,
+    )
+
+
+def buckets_for(api_key: str, namespace: str, dataset: str) -> list[TokenBucket]:
+    """Return the buckets a request for the given API key and dataset must take tokens from"""
+    buckets = []
+    if settings.rate_limit_per_second > 0:
+        if api_key not in _key_buckets:
+            # Not named after the key, bucket names are served by /rate_limits
+            _key_buckets[api_key] = _bucket(
+                "api_key",
+                settings.rate_limit_per_second,
+                settings.rate_limit_burst,
+            )
+        buckets.append(_key_buckets[api_key])
+
+    name = f"{namespace}/{dataset}".upper()
+    if name not in _dataset_buckets:
+        limit = _parse_dataset_limits(settings.rate_limit_datasets).get(name)
+        _dataset_buckets[name] = _bucket(name, *limit) if limit is not None else None
+    if _dataset_buckets[name] is not None:
+        buckets.append(_dataset_buckets[name])
+    return buckets
+
+
+async def acquire_all(buckets: list[TokenBucket], max_wait: float | None = None):
+    """Take a token from every bucket, giving back those already taken if one fails
+
+    Raises:
+        RateLimitExceeded: If any of the buckets sheds the request
+    """
+    taken = []
+    try:
+        for bucket in buckets:
+            await bucket.acquire(max_wait)
+            taken.append(bucket)
+    except BaseException:
+        for bucket in taken:
+            bucket.release()
+        raise
+
+
+def limiter_stats() -> list[dict]:
+    """Stats of every rate limiter in use"""
+    buckets = [*_key_buckets.values(), *_dataset_buckets.values()]
+    return [bucket.stats() for bucket in buckets if bucket is not None]
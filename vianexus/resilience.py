@@ -0,0 +1,164 @@
+"""Retry and circuit breaker helpers for Vianexus API requests.
+
+Failed idempotent GETs are retried a bounded number of times with jittered
+exponential backoff. Each (namespace, dataset) pair has a circuit breaker that stops
+sending requests for a while once too many recent attempts failed, so a degraded
+upstream fails fast instead of tying up workers until every request times out.
+"""
+
+import logging
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Response statuses worth retrying: throttling and server-side errors
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the circuit breaker is open"""
+
+
+def backoff_delay(attempt: int, base: float, maximum: float) -> float:
+    """Full-jitter exponential backoff delay in seconds for the given retry attempt (0-based)"""
+    return random.uniform(0, min(maximum, base * 2**attempt))
+
+
+def retry_after(response: httpx.Response) -> float | None:
+    """Seconds to wait before retrying, from the Retry-After header of a response
+
+    Returns:
+        The delay given in seconds or as an HTTP date, or None if there is no valid header
+    """
+    value = response.headers.get("Retry-After", "").strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker over a rolling time window.
+
+    closed: requests flow, outcomes are recorded.
+    open: requests are rejected with CircuitOpenError until open_seconds have passed.
+    half-open: a single trial request is let through; its outcome closes or reopens
+    the circuit.
+
+    allow() hands out the breaker's generation, which changes whenever the circuit opens
+    or closes, and calls report their outcome with it. Outcomes of calls that started in
+    an earlier generation (e.g. requests still in flight when the circuit opened) are
+    ignored, so only the trial decides whether an open circuit closes.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float,
+        min_calls: int,
+        window: float,
+        open_seconds: float,
+    ):
+        """
+        Args:
+            name: Name used in log messages
+            failure_rate: Fraction of failed calls in the window that opens the circuit
+            min_calls: Minimum number of calls in the window before the rate is considered
+            window: Length of the rolling window in seconds
+            open_seconds: Seconds the circuit stays open before a trial call is allowed
+        """
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.open_seconds = open_seconds
+        self._outcomes: deque[tuple[float, bool]] = deque()
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+        self._generation = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.open_seconds:
+            return "open"
+        return "half-open"
+
+    def allow(self) -> int:
+        """Check that a request may be sent
+
+        Returns:
+            The generation to pass to record_success(), record_failure() or release()
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with a trial running
+        """
+        state = self.state
+        if state == "closed":
+            return self._generation
+        if state == "half-open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return self._generation
+        raise CircuitOpenError(f"Circuit breaker for {self.name} is open")
+
+    def _is_trial(self, generation: int) -> bool:
+        # While the circuit is open, only the trial is let through in the current generation
+        return self._opened_at is not None and generation == self._generation
+
+    def record_success(self, generation: int):
+        if generation != self._generation:
+            return
+        if self._is_trial(generation):
+            logger.info(f"Circuit breaker for {self.name} closed")
+            self._opened_at = None
+            self._trial_in_flight = False
+            self._outcomes.clear()
+            self._generation += 1
+        self._record(True)
+
+    def record_failure(self, generation: int):
+        if generation != self._generation:
+            return
+        if self._is_trial(generation):
+            # The half-open trial failed, stay open for another period
+            self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+            return
+        self._record(False)
+        failures = sum(1 for _, ok in self._outcomes if not ok)
+        if (
+            len(self._outcomes) >= self.min_calls
+            and failures / len(self._outcomes) >= self.failure_rate
+        ):
+            logger.warning(
+                f"Circuit breaker for {self.name} opened "
+                f"({failures}/{len(self._outcomes)} recent calls failed)"
+            )
+            self._opened_at = time.monotonic()
+            self._generation += 1
+
+    def release(self, generation: int):
+        """Give back the trial slot of a call that ended without an outcome (e.g. cancelled)
+
+        Calls other than the trial hold no slot, so releasing them changes nothing.
+        """
+        if self._is_trial(generation):
+            self._trial_in_flight = False
+
+    def _record(self, ok: bool):
+        now = time.monotonic()
+        self._outcomes.append((now, ok))
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            self._outcomes.popleft()
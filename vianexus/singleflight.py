@@ -0,0 +1,78 @@
+"""In-flight request coalescing.
+
+When many callers ask for the same upstream data at the same moment, only the
+first one starts the request; the others wait on the same task and share its result.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Hashable
+
+from vianexus.deadline import SharedDeadline, shared_context
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls that share the same key.
+
+    The shared call runs in its own task and is shielded from the callers, so one
+    caller being cancelled (e.g. by a timeout) does not cancel the request for the
+    others waiting on it. It is cancelled once no caller is waiting on it anymore.
+    The task runs in a fresh context under the latest deadline of its callers, which
+    is extended when a caller with a later deadline joins; each caller still bounds
+    its own wait.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, tuple[asyncio.Task, SharedDeadline]] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args) -> Any:
+        """Run func(*args) unless a call for key is already in flight, then await it.
+
+        Args:
+            key: Identifies calls that are interchangeable
+            func: Coroutine function performing the actual work
+            *args: Arguments passed to func
+
+        Returns:
+            The result of the (possibly shared) call
+        """
+        call = self._calls.get(key)
+        if call is None:
+            shared = SharedDeadline()
+            task = asyncio.get_running_loop().create_task(
+                func(*args), context=shared_context(shared)
+            )
+            call = self._calls[key] = (task, shared)
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            logger.debug(f"Joining in-flight request for {key}")
+
+        task, shared = call
+        waiter = shared.join()
+        try:
+            return await asyncio.shield(task)
+        finally:
+            shared.leave(waiter)
+            if not shared and not task.done():
+                logger.debug(f"Cancelling request for {key}, no caller is waiting for it")
+                task.cancel()
+                # The next caller starts a new call rather than joining the cancelled one
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        """Drop a finished call so the next request for key starts a new one."""
+        call = self._calls.get(key)
+        if call is not None and call[0] is task:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
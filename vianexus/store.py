@@ -0,0 +1,281 @@
+"""Stores for STOCK_STATS_US history.
+
+HistoryStore keeps rows in a SQLite database keyed by symbol and date so that history
+survives process restarts and is shared by every uvicorn worker on the box (WAL mode
+lets readers and a writer work concurrently). Its calls are blocking; async callers
+should run them in a worker thread.
+
+MemoryHistoryStore offers the same interface in process memory, for when no on-disk
+store is configured.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from vianexus.schemas import StockStatsData
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stock_stats (
+    symbol TEXT NOT NULL,
+    date TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (symbol, date)
+);
+CREATE TABLE IF NOT EXISTS stock_stats_fetches (
+    symbol TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    depth INTEGER NOT NULL,
+    ascending INTEGER NOT NULL
+);
+"""
+
+
+def trading_days_since(day: str, until: date | None = None) -> int:
+    """Number of weekdays after the given ISO date, up to and including `until` (today)"""
+    start = date.fromisoformat(day)
+    days = ((until or date.today()) - start).days
+    return sum(1 for offset in range(1, days + 1) if (start + timedelta(offset)).weekday() < 5)
+
+
+def merged_depth(previous_depth: int, previous_latest: str | None, dates: list[str], last: int):
+    """Number of most recent rows known to be contiguous after storing a new fetch
+
+    The fetched rows are always the most recent ones, so if they reach back to the
+    latest stored date, or start on the trading day after it, the stored rows are still
+    contiguous with them and the rows newer than the latest stored date extend them.
+    Otherwise there may be a gap and only the fetched rows can be trusted.
+    """
+    if previous_latest is None or not dates:
+        return last
+    oldest = min(dates)
+    if (
+        oldest <= previous_latest
+        or trading_days_since(previous_latest, date.fromisoformat(oldest)) <= 1
+    ):
+        newer = sum(1 for day in dates if day > previous_latest)
+        return max(previous_depth + newer, last)
+    return last
+
+
+def is_ascending(dates: list[str], previous: bool = True) -> bool:
+    """Whether rows are ordered oldest first, keeping the previous order if it cannot be told"""
+    if len(dates) < 2:
+        return previous
+    return dates[0] <= dates[-1]
+
+
+class HistoryStore:
+    """SQLite-backed STOCK_STATS_US rows, read first and written through by StockStats.
+
+    Besides the rows, the store remembers for each symbol when it was last fetched,
+    how many of the most recent rows are known to be complete (depth) and the order
+    upstream returns them in, so a read can answer exactly like the API would.
+    """
+
+    # Calls block on disk I/O and should run in a worker thread
+    blocking = True
+
+    def __init__(self, path: str, retention_days: int):
+        """
+        Args:
+            path: Path of the SQLite database file
+            retention_days: Rows with a date older than this many days are deleted
+        """
+        self.path = path
+        self.retention_days = retention_days
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+            logger.info(f"Opened STOCK_STATS_US history store at {self.path}")
+        return self._conn
+
+    def read(self, symbol: str, last: int, max_age: float) -> list[StockStatsData] | None:
+        """Return the `last` most recent rows for symbol if the store can answer
+
+        Args:
+            symbol: Normalized stock symbol
+            last: Number of most recent rows requested
+            max_age: Seconds since the last upstream fetch for the rows to count as current
+
+        Returns:
+            The rows in upstream order, or None if they are missing or too old
+        """
+        with self._lock:
+            conn = self._connect()
+            fetch = conn.execute(
+                "SELECT fetched_at, depth, ascending FROM stock_stats_fetches WHERE symbol = ?",
+                (symbol,),
+            ).fetchone()
+            if fetch is None:
+                return None
+            fetched_at, depth, ascending = fetch
+            if depth < last or time.time() - fetched_at > max_age:
+                return None
+            payloads = conn.execute(
+                "SELECT payload FROM stock_stats WHERE symbol = ? ORDER BY date DESC LIMIT ?",
+                (symbol, last),
+            ).fetchall()
+
+        rows = [StockStatsData.model_validate_json(payload) for (payload,) in payloads]
+        if ascending:
+            rows.reverse()
+        return rows
+
+    def latest(self, symbol: str) -> tuple[str, int] | None:
+        """Return the latest stored date and contiguous depth for symbol, however old"""
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT MAX(r.date), s.depth FROM stock_stats_fetches s "
+                    "JOIN stock_stats r ON r.symbol = s.symbol WHERE s.symbol = ?",
+                    (symbol,),
+                )
+                .fetchone()
+            )
+        if row is None or row[0] is None:
+            return None
+        return row[0], row[1]
+
+    def write(self, symbol: str, last: int, rows: list[StockStatsData]):
+        """Store rows fetched upstream for symbol with the given `last`
+
+        Args:
+            symbol: Normalized stock symbol
+            last: Number of most recent rows that were requested
+            rows: Rows returned by the API
+        """
+        dates = [row.date for row in rows]
+        cutoff = (date.today() - timedelta(days=self.retention_days)).isoformat()
+
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                previous = conn.execute(
+                    "SELECT s.depth, MAX(r.date), s.ascending FROM stock_stats_fetches s "
+                    "LEFT JOIN stock_stats r ON r.symbol = s.symbol WHERE s.symbol = ?",
+                    (symbol,),
+                ).fetchone()
+                if previous is None or previous[0] is None:
+                    depth, ascending = last, is_ascending(dates)
+                else:
+                    depth = merged_depth(previous[0], previous[1], dates, last)
+                    ascending = is_ascending(dates, bool(previous[2]))
+
+                conn.executemany(
+                    "INSERT OR REPLACE INTO stock_stats (symbol, date, payload) VALUES (?, ?, ?)",
+                    [(symbol, row.date, row.model_dump_json(by_alias=True)) for row in rows],
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO stock_stats_fetches "
+                    "(symbol, fetched_at, depth, ascending) VALUES (?, ?, ?, ?)",
+                    (symbol, time.time(), depth, int(ascending)),
+                )
+                dropped = conn.execute(
+                    "DELETE FROM stock_stats WHERE symbol = ? AND date < ?", (symbol, cutoff)
+                ).rowcount
+                if dropped:
+                    # History extended day by day cannot reach back past retention
+                    conn.execute(
+                        "UPDATE stock_stats_fetches SET depth = MIN(depth, "
+                        "(SELECT COUNT(*) FROM stock_stats WHERE symbol = ?)) WHERE symbol = ?",
+                        (symbol, symbol),
+                    )
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+@dataclass
+class _SymbolHistory:
+    rows: dict[str, StockStatsData] = field(default_factory=dict)
+    fetched_at: float = 0.0
+    depth: int = 0
+    ascending: bool = True
+
+
+class MemoryHistoryStore:
+    """In-process equivalent of HistoryStore, bounded to the most recently used symbols"""
+
+    blocking = False
+
+    def __init__(self, max_symbols: int, retention_days: int):
+        """
+        Args:
+            max_symbols: Number of symbols kept before the least recently used is dropped
+            retention_days: Rows with a date older than this many days are dropped
+        """
+        self.max_symbols = max_symbols
+        self.retention_days = retention_days
+        self._symbols: OrderedDict[str, _SymbolHistory] = OrderedDict()
+
+    def read(self, symbol: str, last: int, max_age: float) -> list[StockStatsData] | None:
+        """Return the `last` most recent rows for symbol if the store can answer
+
+        See HistoryStore.read.
+        """
+        history = self._symbols.get(symbol)
+        if history is None or history.depth < last or time.time() - history.fetched_at > max_age:
+            return None
+        self._symbols.move_to_end(symbol)
+        rows = [history.rows[d] for d in sorted(history.rows, reverse=True)[:last]]
+        if history.ascending:
+            rows.reverse()
+        return rows
+
+    def latest(self, symbol: str) -> tuple[str, int] | None:
+        """Return the latest stored date and contiguous depth for symbol, however old"""
+        history = self._symbols.get(symbol)
+        if history is None or not history.rows:
+            return None
+        return max(history.rows), history.depth
+
+    def write(self, symbol: str, last: int, rows: list[StockStatsData]):
+        """Store rows fetched upstream for symbol with the given `last`
+
+        See HistoryStore.write.
+        """
+        dates = [row.date for row in rows]
+        history = self._symbols.get(symbol)
+        if history is None:
+            history = _SymbolHistory(depth=last, ascending=is_ascending(dates))
+            self._symbols[symbol] = history
+        else:
+            previous_latest = max(history.rows) if history.rows else None
+            history.depth = merged_depth(history.depth, previous_latest, dates, last)
+            history.ascending = is_ascending(dates, history.ascending)
+
+        history.rows.update((row.date, row) for row in rows)
+        history.fetched_at = time.time()
+        cutoff = (date.today() - timedelta(days=self.retention_days)).isoformat()
+        dropped = [d for d in history.rows if d < cutoff]
+        for old in dropped:
+            del history.rows[old]
+        if dropped:
+            history.depth = min(history.depth, len(history.rows))
+
+        self._symbols.move_to_end(symbol)
+        while len(self._symbols) > self.max_symbols:
+            self._symbols.popitem(last=False)
+
+    def close(self):
+        """Drop all history"""
+        self._symbols.clear()
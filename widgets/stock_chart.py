@@ -4,18 +4,73 @@ This widget displays historical stock price data as an interactive Plotly chart.
 It shows price trends over a 1-month period with customizable metrics (future).
 """
 
-import json
 import logging
 from fastapi import HTTPException
-import plotly.graph_objects as go
 
+from config import settings
 from registry import register_widget
-from vianexus.dataset import stock_stats
-from utils.plotly_config import base_layout
+from vianexus.cache import response_cache
+from vianexus.dataset import normalize_symbols, stock_stats
+from vianexus.ratelimit import RateLimitExceeded
+from vianexus.resilience import CircuitOpenError
+from vianexus.schemas import StockStatsData
+from utils.plotly_config import base_layout, figure, figure_json, scatter, title
+from utils.responses import RawJSONResponse
 
 logger = logging.getLogger(__name__)
 
 
+def build_chart(symbol: str, records: list[StockStatsData]) -> dict:
+    """Build the moving averages chart of a symbol.
+
+    Args:
+        symbol: Stock ticker symbol, used in the title
+        records: Daily stock statistics, in the order they are plotted
+
+    Returns:
+        dict: Plotly figure with the 50-day and 200-day moving averages
+    """
+    # Extract dates and moving averages from the response
+    dates = []
+    ma_50 = []
+    ma_200 = []
+
+    for record in records:
+        dates.append(record.date)
+        ma_50.append(record.day_50_moving_average)
+        ma_200.append(record.day_200_moving_average)
+
+    traces = [
+        scatter(
+            dates,
+            ma_50,
+            mode="lines+markers",
+            name="50-Day MA",
+            line={"color": "#00B140", "width": 2},
+            marker={"size": 4},
+            hovertemplate="<b>%{x}</b><br>50-Day MA: $%{y:.2f}<extra></extra>",
+        ),
+        scatter(
+            dates,
+            ma_200,
+            mode="lines+markers",
+            name="200-Day MA",
+            line={"color": "#FF8000", "width": 2},
+            marker={"size": 4},
+            hovertemplate="<b>%{x}</b><br>200-Day MA: $%{y:.2f}<extra></extra>",
+        ),
+    ]
+
+    # Apply the dark theme layout
+    layout = {
+        **base_layout(x_title="Date", y_title="Price (USD)", y_format="$,.2f"),
+        "title": title(f"{symbol.upper()} - Moving Averages (1 Month)"),
+        "showlegend": True,  # Show legend for multiple series
+    }
+
+    return figure(traces, layout)
+
+
 @register_widget(
     {
         "name": "Stock Price Chart",
@@ -36,77 +91,62 @@ logger = logging.getLogger(__name__)
         ],
     }
 )
-def get_stock_chart(symbol: str = "AAPL"):
+async def get_stock_chart(symbol: str = "AAPL"):
     """Returns historical stock price chart for a given symbol.
 
     Args:
         symbol (str): Stock ticker symbol. Defaults to "AAPL".
 
     Returns:
-        dict: Plotly figure JSON with historical price data.
+        RawJSONResponse: Plotly figure JSON with historical price data.
 
     Raises:
         HTTPException: If the API call fails or symbol is invalid.
     """
     try:
-        response = stock_stats.data([symbol.upper()], last=30)
-        if not response or len(response) == 0:
-            raise HTTPException(
-                status_code=404, detail=f"No historical data found for symbol: {symbol}"
-            )
+        # Same normalization as the dataset, so equivalent symbols share the cached chart
+        symbols = normalize_symbols([symbol])
 
-        # Extract dates and moving averages from the response
-        dates = []
-        ma_50 = []
-        ma_200 = []
+        # Serve the chart rendered earlier if the cached data it was built from is current
+        cache_key = ("stock_chart", symbols[0])
+        rendered = response_cache.get(cache_key)
+        if rendered is not None and rendered[0] == stock_stats.version(symbols, last=30):
+            return RawJSONResponse(rendered[1])
 
-        for record in response:
-            dates.append(record.date)
-            ma_50.append(record.day_50_moving_average)
-            ma_200.append(record.day_200_moving_average)
-
-        if len(dates) == 0:
+        response = await stock_stats.adata(symbols, last=30, timeout=settings.chart_fetch_timeout)
+        if not response or len(response) == 0:
             raise HTTPException(
-                status_code=404,
-                detail=f"Insufficient historical data for symbol: {symbol}",
-            )
-
-        fig = go.Figure()
-        fig.add_trace(
-            go.Scatter(
-                x=dates,
-                y=ma_50,
-                mode="lines+markers",
-                name="50-Day MA",
-                line={"color": "#00B140", "width": 2},
-                marker={"size": 4},
-                hovertemplate="<b>%{x}</b><br>50-Day MA: $%{y:.2f}<extra></extra>",
+                status_code=404, detail=f"No historical data found for symbol: {symbol}"
             )
-        )
 
-        fig.add_trace(
-            go.Scatter(
-                x=dates,
-                y=ma_200,
-                mode="lines+markers",
-                name="200-Day MA",
-                line={"color": "#FF8000", "width": 2},
-                marker={"size": 4},
-                hovertemplate="<b>%{x}</b><br>200-Day MA: $%{y:.2f}<extra></extra>",
-            )
+        version = stock_stats.record_version(response)
+        if rendered is not None and rendered[0] == version:
+            # Reloaded, but nothing changed since the chart was rendered
+            return RawJSONResponse(rendered[1])
+
+        fig = build_chart(symbols[0], response)
+        content = figure_json(fig).encode()
+        response_cache.set(
+            cache_key,
+            (version, content),
+            ttl=settings.stock_chart_cache_ttl,
+            nbytes=len(content),
         )
 
-        # Apply the dark theme layout
-        layout = base_layout(x_title="Date", y_title="Price (USD)", y_format="$,.2f")
-        layout["title"] = f"{symbol.upper()} - Moving Averages (1 Month)"
-        layout["showlegend"] = True  # Show legend for multiple series
-
-        fig.update_layout(layout)
-
-        return json.loads(fig.to_json())  # type: ignore
+        return RawJSONResponse(content)
 
     except HTTPException:
         raise
+    except (CircuitOpenError, RateLimitExceeded) as e:
+        logger.error(f"Vianexus API request for {symbol} not sent: {e}")
+        raise HTTPException(
+            status_code=503, detail=f"Data source temporarily unavailable for symbol {symbol}"
+        )
+    except TimeoutError:
+        logger.error(f"Timed out fetching stock chart for {symbol}")
+        raise HTTPException(
+            status_code=504, detail=f"Timed out fetching chart data for symbol {symbol}"
+        )
     except Exception as e:
         logger.error(f"Error fetching stock chart for {symbol}: {str(e)}")
 